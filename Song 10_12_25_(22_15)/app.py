@@ -1,15 +1,35 @@
-from flask import Flask, render_template, request, jsonify
+import time
+_startup_began = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, send_file, g
 from r2_manager import R2Manager
+from audio_cache import AudioCache
+from job_queue import JobQueue
+from transcoder import HLSTranscoder
+from metrics import metrics, stats_collector
 import os
 import re
-from werkzeug.utils import secure_filename
+import gzip
+import hashlib
+import traceback
+import requests
+from requests.adapters import HTTPAdapter
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Seconds spent in each startup phase of this worker (reported once initialized)
+startup_timings = {'imports': time.perf_counter() - _startup_began}
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
-app.config['UPLOAD_FOLDER'] = 'temp_uploads'
 
-# Ensure temp upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# JSON responses at least this large are gzip/brotli compressed
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
 
 # Add CORS headers to all responses
 @app.after_request
@@ -19,6 +39,85 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+# Time every route and how much of it was spent waiting on R2
+@app.before_request
+def start_request_timer():
+    g.metrics_token = metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    timer = metrics.current_request()
+    if timer is None:
+        return response
+    
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    total = timer.elapsed()
+    metrics.http_requests.inc(route, request.method, str(response.status_code))
+    metrics.http_latency.observe(route, value=total)
+    metrics.http_storage_latency.observe(route, value=timer.storage_seconds)
+    
+    # Per-request breakdown, visible in browser devtools
+    response.headers['Server-Timing'] = (
+        f'storage;dur={timer.storage_seconds * 1000:.1f};desc="{timer.storage_calls} R2 calls", '
+        f'total;dur={total * 1000:.1f}'
+    )
+    return response
+
+@app.teardown_request
+def end_request_timer(error=None):
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        metrics.end_request(token)
+
+# Compress JSON API responses for clients that accept it
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    if brotli and request.accept_encodings['br']:
+        encoding, data = 'br', brotli.compress(data, quality=5)
+    elif request.accept_encodings['gzip']:
+        encoding, data = 'gzip', gzip.compress(data, compresslevel=6)
+    else:
+        return response
+    
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    
+    # Each encoding is its own representation, so it gets its own strong ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+# Conditional GET for JSON built from R2 objects
+def api_etag(version):
+    """Strong ETag for this request's response, derived from the R2 object versions behind it"""
+    if not version:
+        return None
+    return hashlib.sha256(f"{version}|{request.full_path}".encode('utf-8')).hexdigest()[:32]
+
+def not_modified(etag):
+    """304 response if the client already has this version (in any encoding), else None"""
+    if etag and any(request.if_none_match.contains(f"{etag}{suffix}") for suffix in ('', '-gzip', '-br')):
+        return with_etag(app.response_class(status=304), etag)
+    return None
+
+def with_etag(response, etag):
+    if etag:
+        response.set_etag(etag)
+        # Clients may keep the body but must revalidate on every use
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # Helper function to extract YouTube ID
 def extract_youtube_id(url):
     """Extract YouTube video ID from URL"""
@@ -32,9 +131,34 @@ def extract_youtube_id(url):
             return match.group(1)
     return None
 
-# Initialize R2 Storage Manager
+# Shared keep-alive session for upstream audio requests
+# (raise AUDIO_PROXY_POOL_SIZE with async workers so concurrent streams keep their sockets)
+audio_pool_size = int(os.environ.get('AUDIO_PROXY_POOL_SIZE', 32))
+audio_session = requests.Session()
+audio_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=audio_pool_size))
+audio_session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=audio_pool_size))
+
+# How /api/proxy/audio answers by default: "proxy" streams the bytes through us,
+# "redirect" sends the player to a presigned R2 URL (needs GET in the bucket's CORS rules)
+AUDIO_PROXY_MODE = os.environ.get('AUDIO_PROXY_MODE', 'proxy')
+
+# Local disk cache for popular audio files (shared by all workers)
+audio_cache = AudioCache(
+    cache_dir=os.environ.get('AUDIO_CACHE_DIR', 'audio_cache'),
+    max_bytes=int(os.environ.get('AUDIO_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+)
+metrics.add_collector(stats_collector(
+    'audio_cache', 'Audio disk cache events', audio_cache.get_stats,
+    counters=('hits', 'misses', 'fills', 'fill_errors', 'evictions'), gauges=('files', 'bytes')
+))
+
+# Initialize R2 Storage Manager (the R2 client itself is built lazily after fork)
+phase_began = time.perf_counter()
 try:
-    storage_manager = R2Manager()
+    # The web server keeps metadata and likes locally; CLI commands stay in direct R2 mode
+    storage_manager = R2Manager(local_stores=True)
+    if os.environ.get('R2_WARM_UP', '1') != '0':
+        storage_manager.warm_up()
     print("✅ R2 Storage Manager initialized successfully")
 except Exception as e:
     print(f"❌ Failed to initialize R2 Manager: {e}")
@@ -45,6 +169,207 @@ except Exception as e:
     print("   - R2_BUCKET_NAME (optional, defaults to 'music-wheel')")
     print("   - R2_PUBLIC_URL (optional)")
     storage_manager = None
+startup_timings['storage'] = time.perf_counter() - phase_began
+
+if storage_manager:
+    metrics.add_collector(stats_collector(
+        'object_cache', 'R2 object cache events', storage_manager.cache.get_stats,
+        counters=('hits', 'misses', 'revalidated', 'evictions', 'invalidations'), gauges=('entries',)
+    ))
+    metrics.add_collector(stats_collector(
+        'r2_single_flight', 'Storage reads fetched, coalesced in-process and shared across workers',
+        storage_manager.single_flight.get_stats,
+        counters=('fetches', 'coalesced', 'shared', 'lock_timeouts'), gauges=('in_flight',)
+    ))
+    if storage_manager.metadata_store:
+        metrics.add_collector(stats_collector(
+            'metadata_store', 'Local metadata store reads, R2 loads, writes and syncs back to R2',
+            storage_manager.metadata_store.get_stats,
+            counters=('reads', 'loads', 'writes', 'conflicts', 'synced', 'sync_conflicts', 'sync_errors'),
+            gauges=('documents', 'dirty', 'active')
+        ))
+    metrics.add_collector(stats_collector(
+        'r2_conditional_writes', 'Conditional metadata writes and conflicts', storage_manager.get_write_stats,
+        counters=('conditional_writes', 'conflicts', 'retries', 'exhausted')
+    ))
+
+
+# ===============================
+# Background Jobs
+# ===============================
+
+# Slow album mutations run here; routes return a job ID right away
+phase_began = time.perf_counter()
+job_queue = JobQueue(
+    db_path=os.environ.get('JOB_STORE_PATH', 'jobs.db'),
+    workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+    retryable=storage_manager.is_transient_error if storage_manager else None
+)
+
+
+# Adaptive-bitrate renditions are built after upload when ffmpeg is installed
+transcoder = HLSTranscoder(
+    ffmpeg_path=os.environ.get('FFMPEG_PATH', 'ffmpeg'),
+    bitrates=[int(b) for b in os.environ.get('HLS_BITRATES', '64,128,192').split(',')],
+    segment_seconds=int(os.environ.get('HLS_SEGMENT_SECONDS', 6))
+)
+
+
+def queue_hls(album_name, track_number, style_keys):
+    """Queue HLS transcodes for freshly uploaded audio styles"""
+    if not transcoder.available():
+        return
+    for style_key in style_keys:
+        job_queue.enqueue('transcode_hls', {'album': album_name, 'number': track_number, 'style': style_key})
+
+
+def run_init_album(payload, progress):
+    progress(0, 1, 'Creating album structure')
+    album_id = storage_manager.initialize_album_structure(
+        payload['album'], payload['track_count'], payload['styles'],
+        payload['use_transitions'], payload['lazy_social_data']
+    )
+    return {'message': f'Album "{payload["album"]}" created successfully', 'album_id': album_id}
+
+
+def run_delete_album(payload, progress):
+    progress(0, 1, 'Deleting album files')
+    storage_manager.delete_album(payload['album'])
+    return {'message': f'Album "{payload["album"]}" deleted successfully'}
+
+
+def run_clone_album(payload, progress):
+    """Clone (or, with rename, move) an album with server-side copies"""
+    if payload['rename']:
+        written = storage_manager.rename_album(payload['album'], payload['target'], progress)
+        return {'message': f'Album renamed to "{payload["target"]}"', 'album_id': payload['target'], 'objects': written}
+    
+    written = storage_manager.clone_album(payload['album'], payload['target'], progress)
+    return {'message': f'Album copied to "{payload["target"]}"', 'album_id': payload['target'], 'objects': written}
+
+
+def run_record_track(payload, progress):
+    """Point track_info at files already streamed to R2, plus metadata and YouTube links"""
+    track_number = payload['number']
+    
+    # All track_info changes are committed together with a single write
+    batch = storage_manager.batch_track_update(payload['album'], track_number)
+    batch.set_metadata(payload['name'], payload['artist'])
+    
+    uploaded_files = []
+    lyrics = payload.get('lyrics', {})
+    for key, file_type, style_key in payload['files']:
+        url = batch.set_file(file_type, style_key, lyrics.get(key))
+        uploaded_files.append(f"{key}: {url}")
+    
+    uploaded_files.extend(apply_youtube_links(batch, payload['youtube']))
+    progress(0, 1, 'Updating track info')
+    batch.commit()
+    queue_hls(payload['album'], track_number, [
+        style_key for _, file_type, style_key in payload['files'] if file_type == 'audio'
+    ])
+    
+    print(f"✅ Track {track_number} upload complete: {len(uploaded_files)} items")
+    return {'message': f'Track {track_number} uploaded successfully', 'files': uploaded_files}
+
+
+def run_complete_upload(payload, progress):
+    """Verify directly uploaded files and record them (plus metadata/YouTube links) in track_info.json"""
+    album_name = payload['album']
+    track_number = payload['number']
+    files = payload['files']
+    
+    batch = storage_manager.batch_track_update(album_name, track_number)
+    batch.set_metadata(payload['name'], payload['artist'])
+    
+    uploaded_files = []
+    failed_files = {}
+    audio_styles = []
+    
+    for done, (key, upload) in enumerate(files.items()):
+        progress(done, len(files), f'Verifying {key}')
+        parsed = parse_upload_key(key)
+        if not parsed:
+            failed_files[key] = 'Unknown file key'
+            continue
+        
+        file_type, style_key = parsed
+        try:
+            storage_manager.complete_track_file_upload(
+                album_name, track_number, file_type, style_key, int(upload['size']),
+                upload_id=upload.get('upload_id'), parts=upload.get('parts')
+            )
+        except Exception as e:
+            print(f"  ❌ {key}: {e}")
+            failed_files[key] = str(e)
+            continue
+        
+        # Directly uploaded lyrics are read back once so they can be stored in lyrics.json
+        text = None
+        if file_type in storage_manager.LYRICS_TYPES:
+            text = storage_manager.read_track_lyrics(album_name, track_number, file_type, style_key)
+        
+        url = batch.set_file(file_type, style_key, text)
+        uploaded_files.append(f"{key}: {url}")
+        if file_type == 'audio':
+            audio_styles.append(style_key)
+        print(f"  ✅ Verified: {key}")
+    
+    uploaded_files.extend(apply_youtube_links(batch, payload['youtube']))
+    
+    # Only verified files are recorded, all in one track_info write
+    batch.commit()
+    queue_hls(album_name, track_number, audio_styles)
+    
+    if failed_files:
+        raise Exception(f"{len(failed_files)} file(s) failed verification: " + '; '.join(
+            f"{key}: {error}" for key, error in failed_files.items()
+        ))
+    
+    print(f"✅ Track {track_number} upload complete: {len(uploaded_files)} items")
+    return {'message': f'Track {track_number} uploaded successfully', 'files': uploaded_files}
+
+
+def run_transcode_hls(payload, progress):
+    playlist_url = storage_manager.build_hls_renditions(
+        payload['album'], payload['number'], payload['style'], transcoder, progress
+    )
+    if playlist_url is None:
+        return {'message': 'Skipped - a newer upload replaced this audio', 'hls_url': None}
+    return {'message': 'HLS renditions ready', 'hls_url': playlist_url}
+
+
+if storage_manager:
+    job_queue.register('init_album', run_init_album)
+    job_queue.register('delete_album', run_delete_album)
+    job_queue.register('clone_album', run_clone_album)
+    job_queue.register('record_track', run_record_track)
+    job_queue.register('complete_upload', run_complete_upload)
+    job_queue.register('transcode_hls', run_transcode_hls)
+    job_queue.start()
+    
+    if not transcoder.available():
+        print("⚠️  ffmpeg not found - uploads will be served as single MP3s (no HLS renditions)")
+startup_timings['jobs'] = time.perf_counter() - phase_began
+
+
+def report_startup():
+    """Print and export how long this worker took to become ready"""
+    startup_timings['total'] = time.perf_counter() - _startup_began
+    for phase, seconds in startup_timings.items():
+        metrics.startup.set(phase, value=seconds)
+    print("⏱️  Startup (pid {}): {}".format(
+        os.getpid(), ', '.join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in startup_timings.items())
+    ))
+
+
+report_startup()
+
+
+def queued(job_id, message):
+    """202 response pointing the client at /api/jobs/<job_id>"""
+    return jsonify({'status': 'queued', 'job_id': job_id, 'message': message}), 202
 
 
 # ===============================
@@ -69,13 +394,28 @@ def upload_page():
 
 @app.route('/api/albums/list', methods=['GET'])
 def list_albums():
-    """Get list of all albums from R2 storage"""
+    """Get list of albums from the album index (supports sort/order/offset/limit)"""
     try:
         if not storage_manager:
             return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
         
-        albums = storage_manager.list_albums()
-        return jsonify({'status': 'success', 'albums': albums})
+        sort = request.args.get('sort', 'name')
+        descending = request.args.get('order', 'asc') == 'desc'
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = request.args.get('limit', type=int)
+        
+        etag = api_etag(storage_manager.get_album_index_version())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        albums, total = storage_manager.list_album_summaries(sort, descending, offset, limit)
+        return with_etag(jsonify({
+            'status': 'success',
+            'albums': [album['name'] for album in albums],
+            'details': albums,
+            'total': total
+        }), etag)
     except Exception as e:
         print(f"Error listing albums: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -92,22 +432,54 @@ def load_album():
         if not album_name:
             return jsonify({'status': 'error', 'message': 'Album name required'}), 400
         
+        include_lyrics = request.args.get('lyrics') == '1'
+        etag = api_etag(storage_manager.get_album_version(album_name, include_lyrics=include_lyrics))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
         print(f"\n📖 Loading album: {album_name}")
-        album_data = storage_manager.load_album_data(album_name)
+        album_data = storage_manager.load_album_data(album_name, include_lyrics=include_lyrics)
         
         if album_data:
             print(f"✅ Album loaded: {len(album_data.get('tracks', {}))} tracks")
-            return jsonify({'status': 'success', 'data': album_data})
+            return with_etag(jsonify({'status': 'success', 'data': album_data}), etag)
         else:
             return jsonify({'status': 'error', 'message': 'Album not found'}), 404
             
     except Exception as e:
         print(f"Error loading album: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/api/track/lyrics', methods=['GET'])
+def track_lyrics():
+    """All style and transition lyrics of a track in one response"""
+    try:
+        if not storage_manager:
+            return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
+        
+        album_name = request.args.get('album')
+        track_number = request.args.get('track', type=int)
+        if not album_name or track_number is None:
+            return jsonify({'status': 'error', 'message': 'Album and track required'}), 400
+        
+        etag = api_etag(storage_manager.get_track_lyrics_version(album_name, track_number))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        lyrics = storage_manager.get_track_lyrics(album_name, track_number)
+        if lyrics is None:
+            return jsonify({'status': 'error', 'message': 'Track not found'}), 404
+        return with_etag(jsonify({'status': 'success', 'lyrics': lyrics}), etag)
+        
+    except Exception as e:
+        print(f"Error loading lyrics: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @app.route('/api/album/init', methods=['POST'])
 def init_album():
     """Initialize new album structure in R2 storage"""
@@ -120,6 +492,7 @@ def init_album():
         track_count = data.get('trackCount', 8)
         styles = data.get('styles', ['Rock', 'Funk', 'Hip Hop', 'Blues', 'Theatrical'])
         use_transitions = data.get('useTransitions', False)
+        lazy_social_data = data.get('lazySocialData', False)
         
         if not album_name:
             return jsonify({'status': 'error', 'message': 'Album name required'}), 400
@@ -129,17 +502,17 @@ def init_album():
         print(f"🎨 Styles: {styles}")
         print(f"🔄 Transitions: {'Yes' if use_transitions else 'No'}")
         
-        album_id = storage_manager.initialize_album_structure(album_name, track_count, styles, use_transitions)
-        
-        return jsonify({
-            'status': 'success',
-            'message': f'Album "{album_name}" created successfully',
-            'album_id': album_id
+        job_id = job_queue.enqueue('init_album', {
+            'album': album_name,
+            'track_count': track_count,
+            'styles': styles,
+            'use_transitions': use_transitions,
+            'lazy_social_data': lazy_social_data
         })
+        return queued(job_id, f'Creating album "{album_name}"')
         
     except Exception as e:
         print(f"Error initializing album: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -159,153 +532,305 @@ def delete_album():
         
         print(f"\n🗑️ Deleting album: {album_name}")
         
-        storage_manager.delete_album(album_name)
-        
-        return jsonify({
-            'status': 'success',
-            'message': f'Album "{album_name}" deleted successfully'
-        })
+        job_id = job_queue.enqueue('delete_album', {'album': album_name})
+        return queued(job_id, f'Deleting album "{album_name}"')
         
     except Exception as e:
         print(f"Error initializing album: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
-@app.route('/api/upload/track', methods=['POST'])
-def upload_track():
-    """Upload track files or YouTube links to R2 storage"""
+@app.route('/api/album/clone', methods=['POST'])
+def clone_album():
+    """Copy an album under a new name (R2 copies objects server-side)"""
+    return queue_album_copy(rename=False)
+
+
+@app.route('/api/album/rename', methods=['POST'])
+def rename_album():
+    """Rename an album (server-side copy, then delete the original)"""
+    return queue_album_copy(rename=True)
+
+
+def queue_album_copy(rename):
     try:
         if not storage_manager:
             return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
         
-        # Get form data
-        album_name = request.form.get('album')
-        track_number = int(request.form.get('number'))
-        track_name = request.form.get('name', f'Track {track_number}')
-        artist_name = request.form.get('artist', 'Unknown Artist')
+        data = request.json
+        album_name = data.get('album')
+        new_name = (data.get('newName') or '').strip()
         
-        print(f"\n📤 Uploading Track {track_number}: {track_name} by {artist_name}")
+        if not album_name or not new_name:
+            return jsonify({'status': 'error', 'message': 'Album name and new name required'}), 400
+        if '/' in new_name or new_name == album_name:
+            return jsonify({'status': 'error', 'message': 'Invalid new album name'}), 400
+        if not storage_manager.album_exists(album_name):
+            return jsonify({'status': 'error', 'message': 'Album not found'}), 404
+        if storage_manager.album_exists(new_name):
+            return jsonify({'status': 'error', 'message': f'Album "{new_name}" already exists'}), 409
         
-        # Update track metadata
-        storage_manager.update_track_metadata(album_name, track_number, track_name, artist_name)
-        
-        uploaded_files = []
-        
-        # Upload icon if present
-        if 'icon' in request.files:
-            icon_file = request.files['icon']
-            if icon_file.filename:
-                filename = secure_filename(icon_file.filename)
-                temp_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                icon_file.save(temp_path)
-                
-                try:
-                    url = storage_manager.upload_track_file(
-                        album_name, track_number, 'icon', None, temp_path
-                    )
-                    uploaded_files.append(f"icon: {url}")
-                finally:
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-        
-        # Process YouTube links first
-        for key in request.form:
-            if key in ['album', 'number', 'name', 'artist']:
-                continue
+        print(f"\n📋 {'Renaming' if rename else 'Copying'} album: {album_name} → {new_name}")
+        
+        job_id = job_queue.enqueue('clone_album', {'album': album_name, 'target': new_name, 'rename': rename})
+        return queued(job_id, f'{"Renaming" if rename else "Copying"} album "{album_name}"')
+        
+    except Exception as e:
+        print(f"Error copying album: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+def parse_upload_key(key):
+    """Map an upload form key to (file_type, style_key), or None if unknown"""
+    # Keys: "icon", "track_rock", "lyrics_rock", "transition_rock", "transition_lyrics_rock"
+    if key == 'icon':
+        return 'icon', None
+    
+    parts = key.split('_')
+    
+    if parts[0] == 'track':
+        return 'audio', '_'.join(parts[1:])
+    elif parts[0] == 'lyrics':
+        return 'lyrics', '_'.join(parts[1:])
+    elif parts[0] == 'transition' and len(parts) > 1:
+        if parts[1] == 'lyrics':
+            return 'transition_lyrics', '_'.join(parts[2:])
+        return 'transition_audio', '_'.join(parts[1:])
+    return None
+
+
+def stream_multipart(stream, boundary, form, open_file):
+    """
+    Parse a multipart body incrementally without spooling files to disk
+    Text fields are collected into `form`; for each file part `open_file(name)`
+    returns a writer (write/close/abort) that receives the file's bytes.
+    """
+    parser = MultipartDecoder(boundary.encode('ascii'), max_form_memory_size=500 * 1024)
+    current = None
+    writer = None
+    field_chunks = []
+    
+    try:
+        while True:
+            data = stream.read(64 * 1024)
+            parser.receive_data(data or None)
+            event = parser.next_event()
+            
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, Field):
+                    current = event
+                    field_chunks = []
+                elif isinstance(event, File):
+                    current = event
+                    writer = open_file(event.name) if event.filename else None
+                elif isinstance(event, Data):
+                    if isinstance(current, Field):
+                        field_chunks.append(event.data)
+                        if not event.more_data:
+                            form[current.name] = b''.join(field_chunks).decode('utf-8', 'replace')
+                    elif writer:
+                        writer.write(event.data)
+                        if not event.more_data:
+                            writer.close()
+                            writer = None
+                event = parser.next_event()
             
-            if key.startswith('youtube_'):
-                youtube_url = request.form[key]
-                if not youtube_url:
-                    continue
-                
-                video_id = extract_youtube_id(youtube_url)
-                if not video_id:
-                    print(f"  ⚠️  Invalid YouTube URL: {youtube_url}")
-                    continue
-                
-                # Parse key: "youtube_track_rock", "youtube_transition_rock"
-                parts = key.split('_')[1:]  # Remove 'youtube_' prefix
-                
-                if parts[0] == 'track':
-                    style_key = '_'.join(parts[1:])
-                    file_type = 'audio'
-                elif parts[0] == 'transition':
-                    style_key = '_'.join(parts[1:])
-                    file_type = 'transition_audio'
-                else:
-                    continue
-                
-                # Store YouTube video ID
-                url = storage_manager.store_youtube_link(
-                    album_name, track_number, file_type, style_key, video_id
-                )
-                uploaded_files.append(f"{key}: {url}")
-                print(f"  ✅ YouTube link stored: {key}")
-        
-        # Process all uploaded files
-        for key in request.files:
-            if key == 'icon':
+            if not data or isinstance(event, Epilogue):
+                break
+    except Exception:
+        if writer:
+            writer.abort()
+        raise
+
+
+def apply_youtube_links(batch, form):
+    """Queue every youtube_* form field on a TrackInfoBatch, returns 'key: url' strings"""
+    stored = []
+    for key in form:
+        if key.startswith('youtube_'):
+            youtube_url = form[key]
+            if not youtube_url:
                 continue
-                
-            file = request.files[key]
-            if not file.filename:
+            
+            video_id = extract_youtube_id(youtube_url)
+            if not video_id:
+                print(f"  ⚠️  Invalid YouTube URL: {youtube_url}")
                 continue
             
-            # Parse key: "track_rock", "lyrics_rock", "transition_rock", "transition_lyrics_rock"
-            parts = key.split('_')
+            # Parse key: "youtube_track_rock", "youtube_transition_rock"
+            parts = key.split('_')[1:]  # Remove 'youtube_' prefix
             
             if parts[0] == 'track':
-                # track_rock.mp3
                 style_key = '_'.join(parts[1:])
                 file_type = 'audio'
-            elif parts[0] == 'lyrics':
-                # lyrics_rock.txt
-                style_key = '_'.join(parts[1:])
-                file_type = 'lyrics'
             elif parts[0] == 'transition':
-                if parts[1] == 'lyrics':
-                    # transition_lyrics_rock.txt
-                    style_key = '_'.join(parts[2:])
-                    file_type = 'transition_lyrics'
-                else:
-                    # transition_rock.mp3
-                    style_key = '_'.join(parts[1:])
-                    file_type = 'transition_audio'
+                style_key = '_'.join(parts[1:])
+                file_type = 'transition_audio'
             else:
                 continue
             
-            # Save file temporarily
-            filename = secure_filename(file.filename)
-            temp_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(temp_path)
+            # Store YouTube video ID
+            url = batch.set_youtube_link(file_type, style_key, video_id)
+            stored.append(f"{key}: {url}")
+            print(f"  ✅ YouTube link stored: {key}")
+    return stored
+
+
+@app.route('/api/upload/track', methods=['POST'])
+def upload_track():
+    """Upload track files or YouTube links to R2 storage"""
+    try:
+        if not storage_manager:
+            return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
+        
+        boundary = request.mimetype_params.get('boundary')
+        if request.mimetype != 'multipart/form-data' or not boundary:
+            return jsonify({'status': 'error', 'message': 'Expected multipart/form-data'}), 400
+        
+        form = {}
+        streamed_files = []
+        lyrics_writers = {}
+        
+        def open_file(key):
+            parsed = parse_upload_key(key)
+            if not parsed:
+                return None
+            if 'album' not in form or 'number' not in form:
+                raise Exception('album and number fields must precede files')
             
-            try:
-                url = storage_manager.upload_track_file(
-                    album_name, track_number, file_type, style_key, temp_path
-                )
-                uploaded_files.append(f"{key}: {url}")
-                print(f"  ✅ Uploaded: {key}")
-            finally:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+            file_type, style_key = parsed
+            writer = storage_manager.open_track_file_stream(
+                form['album'], int(form['number']), file_type, style_key
+            )
+            streamed_files.append((key, file_type, style_key))
+            if file_type in storage_manager.LYRICS_TYPES:
+                lyrics_writers[key] = writer
+            return writer
         
-        print(f"✅ Track {track_number} upload complete: {len(uploaded_files)} items")
+        # Files are piped straight from the request body into R2
+        stream_multipart(request.stream, boundary, form, open_file)
         
-        return jsonify({
-            'status': 'success',
-            'message': f'Track {track_number} uploaded successfully',
-            'files': uploaded_files
+        # Get form data
+        album_name = form.get('album')
+        track_number = int(form.get('number'))
+        track_name = form.get('name', f'Track {track_number}')
+        artist_name = form.get('artist', 'Unknown Artist')
+        
+        print(f"\n📤 Uploading Track {track_number}: {track_name} by {artist_name}")
+        for key, _, _ in streamed_files:
+            print(f"  ✅ Uploaded: {key}")
+        
+        # The bytes are in R2 - recording them in track_info happens in the background
+        job_id = job_queue.enqueue('record_track', {
+            'album': album_name,
+            'number': track_number,
+            'name': track_name,
+            'artist': artist_name,
+            'files': streamed_files,
+            'lyrics': {key: writer.captured_text() for key, writer in lyrics_writers.items()},
+            'youtube': {key: value for key, value in form.items() if key.startswith('youtube_')}
         })
+        return queued(job_id, f'Recording Track {track_number}')
         
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         print(f"Error uploading track: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+# ===============================
+# Direct-to-R2 Uploads
+# ===============================
+
+@app.route('/api/upload/presign', methods=['POST'])
+def presign_upload():
+    """Issue presigned PUT / multipart part URLs so the browser uploads files straight to R2"""
+    try:
+        if not storage_manager:
+            return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
+        
+        data = request.json
+        album_name = data.get('album')
+        track_number = int(data.get('number'))
+        
+        if not album_name:
+            return jsonify({'status': 'error', 'message': 'Album name required'}), 400
+        
+        uploads = {}
+        for key, size in data.get('files', {}).items():
+            parsed = parse_upload_key(key)
+            if not parsed:
+                return jsonify({'status': 'error', 'message': f'Unknown file key: {key}'}), 400
+            
+            file_type, style_key = parsed
+            uploads[key] = storage_manager.presign_track_file_upload(
+                album_name, track_number, file_type, style_key, int(size)
+            )
+        
+        return jsonify({'status': 'success', 'uploads': uploads})
+        
+    except Exception as e:
+        print(f"Error presigning upload: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/api/upload/complete', methods=['POST'])
+def complete_upload():
+    """Queue verification of directly uploaded files and their track_info.json update"""
+    try:
+        if not storage_manager:
+            return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
+        
+        data = request.json
+        album_name = data.get('album')
+        track_number = int(data.get('number'))
+        track_name = data.get('name', f'Track {track_number}')
+        artist_name = data.get('artist', 'Unknown Artist')
+        
+        print(f"\n📤 Completing direct upload of Track {track_number}: {track_name} by {artist_name}")
+        
+        job_id = job_queue.enqueue('complete_upload', {
+            'album': album_name,
+            'number': track_number,
+            'name': track_name,
+            'artist': artist_name,
+            'files': data.get('files', {}),
+            'youtube': data.get('youtube', {})
+        })
+        return queued(job_id, f'Verifying Track {track_number}')
+        
+    except Exception as e:
+        print(f"Error completing upload: {e}")
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/api/upload/abort', methods=['POST'])
+def abort_upload():
+    """Abandon a direct multipart upload"""
+    try:
+        if not storage_manager:
+            return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
+        
+        data = request.json
+        parsed = parse_upload_key(data.get('key', ''))
+        if not parsed or not data.get('upload_id'):
+            return jsonify({'status': 'error', 'message': 'File key and upload_id required'}), 400
+        
+        file_type, style_key = parsed
+        storage_manager.abort_track_file_upload(
+            data.get('album'), int(data.get('number')), file_type, style_key, data['upload_id']
+        )
+        return jsonify({'status': 'success'})
+        
+    except Exception as e:
+        print(f"Error aborting upload: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 # ===============================
 # Social Features API
 # ===============================
@@ -354,21 +879,62 @@ def add_comment():
 
 @app.route('/api/social/comments', methods=['GET'])
 def get_comments():
-    """Get all comments for a track"""
+    """Get a page of comments for a track, newest first"""
     try:
         if not storage_manager:
             return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
         
         album_name = request.args.get('album')
         track_number = int(request.args.get('track'))
+        cursor = request.args.get('cursor', type=int)
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        
+        etag = api_etag(storage_manager.get_comments_version(album_name, track_number))
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        comments = storage_manager.get_comments(album_name, track_number)
-        return jsonify({'status': 'success', 'comments': comments})
+        page = storage_manager.get_comments(album_name, track_number, cursor, limit)
+        return with_etag(
+            jsonify({'status': 'success', 'comments': page['comments'], 'next_cursor': page['next_cursor']}),
+            etag
+        )
     except Exception as e:
         print(f"Error getting comments: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Get a background job's state (queued/running/succeeded/failed), progress and result"""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job})
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get R2/audio cache hit/miss counters and conditional write conflict rates"""
+    if not storage_manager:
+        return jsonify({'status': 'error', 'message': 'Storage not initialized'}), 500
+    
+    return jsonify({
+        'status': 'success',
+        'cache': storage_manager.cache.get_stats(),
+        'audio_cache': audio_cache.get_stats(),
+        'writes': storage_manager.get_write_stats(),
+        'single_flight': storage_manager.single_flight.get_stats(),
+        'metadata_store': storage_manager.metadata_store.get_stats() if storage_manager.metadata_store else None
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics: R2 call latency/bytes/errors, route latency, cache and proxy stream counters"""
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 # ===============================
 # Error Handlers
 # ===============================
@@ -405,31 +971,123 @@ if __name__ == '__main__':
 # Audio Proxy for CORS
 # ===============================
 
+def send_cached_audio(key, etag):
+    """Response for an object version in the audio disk cache, or None on a miss"""
+    cached_path = audio_cache.lookup(key, etag)
+    if not cached_path:
+        return None
+    
+    # send_file handles Range/conditional requests and uses sendfile under gunicorn
+    response = send_file(
+        cached_path,
+        mimetype='audio/mpeg',
+        conditional=True,
+        etag=etag.strip('"'),
+        max_age=0
+    )
+    response.headers['Access-Control-Expose-Headers'] = 'Content-Length, Content-Range, Accept-Ranges'
+    return response
+
+
+def upstream_object_size(response):
+    """Full object size of a 200 or 206 upstream response, or None"""
+    content_range = response.headers.get('Content-Range', '')
+    total = content_range.rpartition('/')[2]
+    if total.isdigit():
+        return int(total)
+    length = response.headers.get('Content-Length')
+    return int(length) if response.status_code == 200 and length and length.isdigit() else None
+
+
 @app.route('/api/proxy/audio')
 def proxy_audio():
-    """Proxy audio files from R2 to avoid CORS issues"""
+    """
+    Serve audio files from our R2 bucket without CORS issues
+    mode=proxy streams the file (supports HTTP Range); mode=redirect answers
+    with a 302 to a presigned R2 URL and mode=json returns that URL.
+    """
     try:
         url = request.args.get('url')
         if not url:
             return jsonify({'error': 'No URL provided'}), 400
         
-        import requests
-        response = requests.get(url, stream=True)
+        if not storage_manager:
+            return jsonify({'error': 'Storage not initialized'}), 500
+        
+        # Only our own album files - this is not an open proxy
+        key = storage_manager.key_from_url(url)
+        if not key or not key.startswith('albums/'):
+            return jsonify({'error': 'URL is not an album file in this bucket'}), 403
+        
+        mode = request.args.get('mode', AUDIO_PROXY_MODE)
+        if mode in ('redirect', 'json'):
+            signed_url, expires_in = storage_manager.get_signed_url(key)
+            if mode == 'json':
+                return jsonify({'url': signed_url, 'expires_in': expires_in})
+            
+            response = app.redirect(signed_url, code=302)
+            # Let the browser reuse the redirect while the signature is comfortably valid
+            response.headers['Cache-Control'] = f'private, max-age={max(0, expires_in - 300)}'
+            return response
+        
+        # Serve from the disk cache when the current ETag is known (from a recent request, no HEAD needed)
+        etag = storage_manager.get_object_etag(key, fetch=False)
+        if etag:
+            cached = send_cached_audio(key, etag)
+            if cached:
+                return cached
+        
+        # Forward the client's Range so seeks only fetch the bytes they need
+        upstream_headers = {}
+        if request.headers.get('Range'):
+            upstream_headers['Range'] = request.headers['Range']
+        
+        response = audio_session.get(url, headers=upstream_headers, stream=True, timeout=(5, 30))
+        
+        if response.status_code not in (200, 206):
+            status = response.status_code
+            headers = {}
+            if status == 416 and response.headers.get('Content-Range'):
+                headers['Content-Range'] = response.headers['Content-Range']
+            response.close()
+            return app.response_class(status=status, headers=headers)
+        
+        # The GET answers with the ETag and size a HEAD would have - cache the file under them
+        upstream_etag = response.headers.get('ETag')
+        if upstream_etag:
+            storage_manager.remember_object_etag(key, upstream_object_size(response), upstream_etag)
+            if upstream_etag != etag:
+                cached = send_cached_audio(key, upstream_etag)
+                if cached:
+                    response.close()
+                    return cached
+            audio_cache.fill_async(key, upstream_etag, storage_manager)
+        
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Content-Length, Content-Range, Accept-Ranges',
+            'Content-Type': response.headers.get('Content-Type', 'audio/mpeg'),
+            'Accept-Ranges': 'bytes'
+        }
+        for name in ('Content-Length', 'Content-Range', 'ETag', 'Last-Modified'):
+            if response.headers.get(name):
+                headers[name] = response.headers[name]
         
         def generate():
-            for chunk in response.iter_content(chunk_size=8192):
-                yield chunk
+            metrics.proxy_streams.inc()
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    yield chunk
+            finally:
+                metrics.proxy_streams.dec()
+                response.close()
         
         return app.response_class(
             generate(),
+            status=response.status_code,
             mimetype='audio/mpeg',
-            headers={
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'audio/mpeg',
-                'Accept-Ranges': 'bytes'
-            }
+            headers=headers
         )
     except Exception as e:
         print(f"Error proxying audio: {e}")
         return jsonify({'error': str(e)}), 500
-
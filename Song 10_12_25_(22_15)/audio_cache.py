@@ -0,0 +1,166 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+
+
+class AudioCache:
+    """
+    On-disk cache for proxied audio files
+    Entries are keyed by R2 object key + ETag and evicted LRU by byte budget.
+    Safe to share between gunicorn workers: files are written to a temp file
+    and atomically renamed, and fills are guarded by an exclusive lock file.
+    """
+    
+    LOCK_TIMEOUT = 600  # seconds before an abandoned fill lock is ignored
+    
+    def __init__(self, cache_dir='audio_cache', max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'fills': 0, 'fill_errors': 0, 'evictions': 0}
+        self._stats_lock = threading.Lock()
+        # Paths this process is filling, so concurrent misses start one download per object
+        self._filling = set()
+        self._filling_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._purge_partial()
+    
+    def _record(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+    
+    def path_for(self, key, etag):
+        """Cache file path for an object version"""
+        digest = hashlib.sha256(f"{key}\n{etag}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.mp3")
+    
+    def lookup(self, key, etag):
+        """Return the cached file path, or None on a miss"""
+        path = self.path_for(key, etag)
+        try:
+            # Bump mtime - it is the LRU clock shared by all workers
+            os.utime(path, None)
+        except FileNotFoundError:
+            self._record('misses')
+            return None
+        
+        self._record('hits')
+        return path
+    
+    def fill_async(self, key, etag, storage_manager):
+        """Download an object into the cache in a background thread (None if this process is already filling it)"""
+        path = self.path_for(key, etag)
+        with self._filling_lock:
+            if path in self._filling:
+                return None
+            self._filling.add(path)
+        
+        def run():
+            try:
+                self.fill(key, etag, storage_manager)
+            finally:
+                with self._filling_lock:
+                    self._filling.discard(path)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+    
+    def fill(self, key, etag, storage_manager):
+        """Download an object into the cache (no-op if another worker is already filling it)"""
+        path = self.path_for(key, etag)
+        lock_path = f"{path}.lock"
+        
+        if os.path.exists(path) or not self._acquire_lock(lock_path):
+            return
+        
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+            with os.fdopen(fd, 'wb') as f:
+                response = storage_manager.s3.get_object(
+                    Bucket=storage_manager.bucket_name, Key=key, IfMatch=etag
+                )
+                for chunk in response['Body'].iter_chunks(chunk_size=256 * 1024):
+                    f.write(chunk)
+            
+            os.replace(temp_path, path)
+            temp_path = None
+            self._record('fills')
+            self._evict()
+        
+        except Exception as e:
+            self._record('fill_errors')
+            print(f"⚠️  Error caching audio {key}: {e}")
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    
+    def _acquire_lock(self, lock_path):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return True
+        except FileExistsError:
+            # Take over locks left behind by a crashed worker
+            try:
+                if time.time() - os.path.getmtime(lock_path) > self.LOCK_TIMEOUT:
+                    os.remove(lock_path)
+                    return self._acquire_lock(lock_path)
+            except FileNotFoundError:
+                return self._acquire_lock(lock_path)
+            return False
+    
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.mp3'):
+                try:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                except FileNotFoundError:
+                    continue
+        return entries
+    
+    def _purge_partial(self):
+        """Delete .part files left behind by fills that crashed mid-download"""
+        cutoff = time.time() - self.LOCK_TIMEOUT
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.part'):
+                try:
+                    # A fill still in progress keeps writing (and bumping mtime) within its lock timeout
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+    
+    def _evict(self):
+        """Delete least recently used files until the cache fits its byte budget"""
+        self._purge_partial()
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                # Open readers keep their file descriptor, so this is safe mid-stream
+                os.remove(path)
+                total -= size
+                self._record('evictions')
+            except FileNotFoundError:
+                continue
+    
+    def get_stats(self):
+        entries = self._entries()
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['files'] = len(entries)
+        stats['bytes'] = sum(size for _, size, _ in entries)
+        stats['max_bytes'] = self.max_bytes
+        return stats
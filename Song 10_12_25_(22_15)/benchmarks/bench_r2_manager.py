@@ -0,0 +1,185 @@
+"""
+Offline R2Manager benchmarks with per-operation request budgets
+
+Runs R2Manager against an in-process R2 stand-in with injectable latency and
+records wall time plus storage requests by category for every operation.
+Album operations run with the metadata store disabled (METADATA_STORE=0), so
+every manager really starts cold; the store is measured separately on a fresh
+store of its own (first load from R2, local reads and writes, the sync back).
+Exits non-zero if any operation exceeds its request budget.
+
+Usage:
+    python benchmarks/bench_r2_manager.py [--sizes 4 16 64] [--styles 5] [--latency 0.005]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_r2 import FakeR2
+from r2_manager import R2Manager
+
+CATEGORIES = ('GET', 'HEAD', 'PUT', 'LIST', 'DELETE', 'COPY')
+
+# Maximum requests per operation for an album of n tracks; unlisted categories allow 0
+BUDGETS = {
+    'initialize_album_structure': lambda n: {'GET': 1, 'PUT': 2 * n + 3},
+    'load_album_data (cold)': lambda n: {'GET': 1},
+    'load_album_data (warm)': lambda n: {},
+    'upload_track_file': lambda n: {'GET': 2, 'PUT': 3},
+    'toggle_like': lambda n: {'GET': 1},
+    'add_comment': lambda n: {'GET': 3, 'PUT': 3},
+    'metadata_store first load': lambda n: {'GET': 1},
+    'metadata_store warm load': lambda n: {},
+    # The comment head is written to R2 directly (comment IDs are handed out there)
+    'metadata_store add_comment': lambda n: {'GET': 2, 'PUT': 1},
+    # One PUT per changed document (the lease is renewed separately)
+    'metadata_store.sync': lambda n: {'PUT': 2},
+    'delete_album': lambda n: {'GET': 1, 'PUT': 1, 'LIST': 1 + (2 * n + 3) // 1000, 'DELETE': 1 + (2 * n + 3) // 1000},
+}
+
+
+MANAGERS = []
+
+
+def make_manager(fake, work_dir):
+    """Fresh manager (cold cache) on the shared fake bucket"""
+    os.environ['LIKE_STORE_PATH'] = os.path.join(work_dir, f'likes_{time.monotonic_ns()}.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = R2Manager(s3_client=fake, local_stores=True)
+    MANAGERS.append(manager)
+    return manager
+
+
+def shutdown_managers():
+    """Stop background like flushers and metadata syncs before their work directory goes away"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for manager in MANAGERS:
+            if manager.like_aggregator:
+                manager.like_aggregator.shutdown()
+            if manager.metadata_store:
+                manager.metadata_store.shutdown()
+    MANAGERS.clear()
+
+
+def create_album(fake, work_dir, album_name, track_count, style_names):
+    manager = make_manager(fake, work_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.initialize_album_structure(album_name, track_count, style_names, use_transitions=True)
+    return manager
+
+
+def measure(fake, operation):
+    """Run operation() and return (elapsed_ms, request counts)"""
+    fake.reset_counts()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        operation()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms, dict(fake.counts)
+
+
+def run_benchmarks(track_count, style_count, latency, work_dir):
+    """Yield (name, elapsed_ms, counts) for every benchmarked operation"""
+    style_names = [f'Style {i}' for i in range(1, style_count + 1)]
+    fake = FakeR2(latency=latency)
+    
+    # A shared store would answer "cold" loads locally; it gets its own operations below
+    os.environ['METADATA_STORE'] = '0'
+    
+    # Index must exist so album creation measures the steady-state path
+    create_album(fake, work_dir, 'warmup', 1, style_names)
+    
+    manager = make_manager(fake, work_dir)
+    yield ('initialize_album_structure',) + measure(
+        fake, lambda: manager.initialize_album_structure('bench', track_count, style_names, use_transitions=True)
+    )
+    
+    manager = make_manager(fake, work_dir)
+    yield ('load_album_data (cold)',) + measure(fake, lambda: manager.load_album_data('bench'))
+    yield ('load_album_data (warm)',) + measure(fake, lambda: manager.load_album_data('bench'))
+    
+    audio_path = os.path.join(work_dir, 'track.mp3')
+    with open(audio_path, 'wb') as f:
+        f.write(os.urandom(64 * 1024))
+    
+    manager = make_manager(fake, work_dir)
+    yield ('upload_track_file',) + measure(
+        fake, lambda: manager.upload_track_file('bench', 1, 'audio', 'style_1', audio_path)
+    )
+    
+    manager = make_manager(fake, work_dir)
+    yield ('toggle_like',) + measure(fake, lambda: manager.toggle_like('bench', 1, 'bench-user'))
+    
+    setup = make_manager(fake, work_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        setup.add_comment('bench', 1, 'bench-user', 'first')
+    manager = make_manager(fake, work_dir)
+    yield ('add_comment',) + measure(fake, lambda: manager.add_comment('bench', 1, 'bench-user', 'hello'))
+    
+    # Fresh store holding the lease on this bucket, syncing only when asked
+    os.environ['METADATA_STORE'] = '1'
+    os.environ['METADATA_STORE_PATH'] = os.path.join(work_dir, f'metadata_{time.monotonic_ns()}.db')
+    os.environ['METADATA_SYNC_INTERVAL'] = '3600'
+    manager = make_manager(fake, work_dir)
+    store = manager.metadata_store
+    # The lease waits for the storage client, as it does behind the web server's warm-up
+    manager.warm_up().join()
+    store.ready.wait()
+    yield ('metadata_store first load',) + measure(fake, lambda: manager.load_album_data('bench'))
+    yield ('metadata_store warm load',) + measure(fake, lambda: manager.load_album_data('bench'))
+    yield ('metadata_store add_comment',) + measure(fake, lambda: manager.add_comment('bench', 1, 'bench-user', 'local'))
+    yield ('metadata_store.sync',) + measure(fake, lambda: store.sync(wait=True))
+    with contextlib.redirect_stdout(io.StringIO()):
+        store.shutdown()
+    os.environ['METADATA_STORE'] = '0'
+    
+    manager = make_manager(fake, work_dir)
+    yield ('delete_album',) + measure(fake, lambda: manager.delete_album('bench'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark R2Manager against an in-process R2 stand-in')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 16, 64], help='Album sizes (tracks)')
+    parser.add_argument('--styles', type=int, default=5, help='Styles per album')
+    parser.add_argument('--latency', type=float, default=0.005, help='Simulated seconds per request')
+    args = parser.parse_args()
+    
+    os.environ.setdefault('R2_PUBLIC_URL', 'https://pub-bench.r2.dev')
+    header = f"{'operation':<30}{'tracks':>7}{'ms':>10}" + ''.join(f"{c:>8}" for c in CATEGORIES) + '  budget'
+    print(header)
+    print('-' * len(header))
+    
+    over_budget = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for track_count in args.sizes:
+            for name, elapsed_ms, counts in run_benchmarks(track_count, args.styles, args.latency, work_dir):
+                budget = BUDGETS[name](track_count)
+                exceeded = [c for c in CATEGORIES if counts.get(c, 0) > budget.get(c, 0)]
+                status = 'OK' if not exceeded else 'OVER: ' + ', '.join(
+                    f"{c} {counts[c]}>{budget.get(c, 0)}" for c in exceeded
+                )
+                if exceeded:
+                    over_budget.append((name, track_count))
+                
+                print(
+                    f"{name:<30}{track_count:>7}{elapsed_ms:>10.1f}"
+                    + ''.join(f"{counts.get(c, 0):>8}" for c in CATEGORIES)
+                    + f"  {status}"
+                )
+        shutdown_managers()
+    
+    if over_budget:
+        print(f"\n❌ {len(over_budget)} operation(s) over request budget")
+        sys.exit(1)
+    
+    print("\n✅ All operations within request budget")
+
+
+if __name__ == '__main__':
+    main()
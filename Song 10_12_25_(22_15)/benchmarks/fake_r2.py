@@ -0,0 +1,227 @@
+import io
+import time
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+
+class FakeBody(io.BytesIO):
+    """Minimal stand-in for botocore's StreamingBody"""
+    
+    def iter_chunks(self, chunk_size=1024):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class FakePaginator:
+    def __init__(self, client):
+        self.client = client
+    
+    def paginate(self, **kwargs):
+        token = None
+        while True:
+            if token:
+                kwargs['ContinuationToken'] = token
+            page = self.client.list_objects_v2(**kwargs)
+            yield page
+            token = page.get('NextContinuationToken')
+            if not token:
+                return
+
+
+class FakeR2:
+    """
+    In-process S3/R2 stand-in for benchmarking R2Manager
+    Every call sleeps for `latency` seconds (simulating one round-trip) and is
+    counted by category: GET, HEAD, PUT, LIST, DELETE, COPY.
+    Supports the conditional requests R2Manager relies on.
+    """
+    
+    CATEGORIES = {
+        'get_object': 'GET',
+        'head_object': 'HEAD',
+        'put_object': 'PUT',
+        'create_multipart_upload': 'PUT',
+        'upload_part': 'PUT',
+        'complete_multipart_upload': 'PUT',
+        'abort_multipart_upload': 'DELETE',
+        'list_objects_v2': 'LIST',
+        'delete_objects': 'DELETE',
+        'delete_object': 'DELETE',
+        'copy_object': 'COPY',
+    }
+    
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self.counts = Counter()
+        self._uploads = {}
+        self._lock = threading.Lock()
+    
+    def _call(self, operation):
+        with self._lock:
+            self.counts[self.CATEGORIES[operation]] += 1
+        if self.latency:
+            time.sleep(self.latency)
+    
+    def reset_counts(self):
+        with self._lock:
+            self.counts = Counter()
+    
+    def _error(self, code, status, operation):
+        return ClientError(
+            {'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status}},
+            operation
+        )
+    
+    def _store(self, key, data, content_type):
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        self.objects[key] = {
+            'Body': data,
+            'ETag': etag,
+            'ContentType': content_type or 'binary/octet-stream',
+            'LastModified': datetime.now(timezone.utc)
+        }
+        return etag
+    
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None, IfNoneMatch=None, **kwargs):
+        self._call('put_object')
+        data = Body if isinstance(Body, bytes) else Body.read()
+        with self._lock:
+            current = self.objects.get(Key)
+            if IfMatch and (not current or current['ETag'] != IfMatch):
+                raise self._error('PreconditionFailed', 412, 'PutObject')
+            if IfNoneMatch == '*' and current:
+                raise self._error('PreconditionFailed', 412, 'PutObject')
+            return {'ETag': self._store(Key, data, ContentType)}
+    
+    def get_object(self, Bucket, Key, IfNoneMatch=None, IfMatch=None, Range=None, **kwargs):
+        self._call('get_object')
+        obj = self.objects.get(Key)
+        if obj is None:
+            raise self._error('NoSuchKey', 404, 'GetObject')
+        if IfNoneMatch and IfNoneMatch == obj['ETag']:
+            raise self._error('304', 304, 'GetObject')
+        if IfMatch and IfMatch != obj['ETag']:
+            raise self._error('PreconditionFailed', 412, 'GetObject')
+        
+        data = obj['Body']
+        if Range:
+            start, _, end = Range.replace('bytes=', '').partition('-')
+            data = data[int(start):int(end) + 1 if end else None]
+        
+        return {
+            'Body': FakeBody(data),
+            'ETag': obj['ETag'],
+            'ContentLength': len(data),
+            'ContentType': obj['ContentType'],
+            'LastModified': obj['LastModified']
+        }
+    
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call('head_object')
+        obj = self.objects.get(Key)
+        if obj is None:
+            raise self._error('404', 404, 'HeadObject')
+        return {
+            'ETag': obj['ETag'],
+            'ContentLength': len(obj['Body']),
+            'ContentType': obj['ContentType'],
+            'LastModified': obj['LastModified']
+        }
+    
+    def list_objects_v2(self, Bucket, Prefix='', Delimiter=None, ContinuationToken=None, MaxKeys=1000, **kwargs):
+        self._call('list_objects_v2')
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        
+        if Delimiter:
+            entries = []
+            for key in keys:
+                rest = key[len(Prefix):]
+                if Delimiter in rest:
+                    entry = Prefix + rest.split(Delimiter, 1)[0] + Delimiter
+                else:
+                    entry = key
+                if not entries or entries[-1] != entry:
+                    entries.append(entry)
+        else:
+            entries = keys
+        
+        start = int(ContinuationToken) if ContinuationToken else 0
+        page = entries[start:start + MaxKeys]
+        response = {
+            'Contents': [
+                {'Key': key, 'Size': len(self.objects[key]['Body']), 'ETag': self.objects[key]['ETag']}
+                for key in page if key in self.objects
+            ],
+            'CommonPrefixes': [{'Prefix': entry} for entry in page if entry not in self.objects],
+            'IsTruncated': start + MaxKeys < len(entries)
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(start + MaxKeys)
+        return response
+    
+    def get_paginator(self, operation_name):
+        return FakePaginator(self)
+    
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        self._call('delete_objects')
+        deleted = []
+        with self._lock:
+            for obj in Delete['Objects']:
+                if self.objects.pop(obj['Key'], None) is not None:
+                    deleted.append({'Key': obj['Key']})
+        return {'Deleted': deleted}
+    
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._call('delete_object')
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+    
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self._call('copy_object')
+        with self._lock:
+            source = self.objects.get(CopySource['Key'])
+            if source is None:
+                raise self._error('NoSuchKey', 404, 'CopyObject')
+            etag = self._store(Key, source['Body'], kwargs.get('ContentType', source['ContentType']))
+        return {'CopyObjectResult': {'ETag': etag}}
+    
+    def create_multipart_upload(self, Bucket, Key, ContentType=None, **kwargs):
+        self._call('create_multipart_upload')
+        with self._lock:
+            upload_id = str(len(self._uploads) + 1)
+            self._uploads[upload_id] = {'Key': Key, 'ContentType': ContentType, 'Parts': {}}
+        return {'UploadId': upload_id}
+    
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._call('upload_part')
+        data = Body if isinstance(Body, bytes) else Body.read()
+        with self._lock:
+            self._uploads[UploadId]['Parts'][PartNumber] = data
+        return {'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+    
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._call('complete_multipart_upload')
+        with self._lock:
+            upload = self._uploads.pop(UploadId)
+            data = b''.join(upload['Parts'][part['PartNumber']] for part in MultipartUpload['Parts'])
+            etag = self._store(Key, data, upload['ContentType'])
+        return {'ETag': etag}
+    
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._call('abort_multipart_upload')
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+    
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        # Signing is local in boto3 - no round-trip
+        return f"https://fake-r2.local/{Params['Bucket']}/{Params['Key']}?method={ClientMethod}&expires={ExpiresIn}"
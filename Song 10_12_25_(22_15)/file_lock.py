@@ -0,0 +1,23 @@
+import time
+import fcntl
+
+# Seconds between non-blocking attempts (cooperative under gevent)
+POLL_INTERVAL = 0.01
+
+
+def acquire(lock_file, timeout=None):
+    """
+    Take an exclusive flock on an open file, returns False if it is still held after timeout
+    The lock is polled with LOCK_NB instead of blocking in the kernel, so a
+    gevent worker keeps serving other requests while it waits. timeout=None
+    waits for as long as it takes; 0 makes a single attempt.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
@@ -0,0 +1,26 @@
+import os
+
+# Serving mode: "sync" (default) or "async" (gevent)
+# In async mode every worker runs on a gevent event loop: sockets, the boto3
+# client, requests (audio proxy) and the background threads are monkey-patched
+# to cooperative greenlets, so an open audio stream costs one greenlet instead
+# of one worker and album loads no longer queue behind listeners.
+SERVING_MODE = os.environ.get('SERVING_MODE', 'sync')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+if SERVING_MODE == 'async':
+    worker_class = 'gevent'
+    # Concurrent connections (streams + API calls) per worker
+    worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 2000))
+    # The app must be imported after gevent patches the worker - never preload
+    preload_app = False
+    
+    # Connection pools sized for many concurrent greenlets (inherited by workers)
+    os.environ.setdefault('R2_MAX_WORKERS', '64')
+    os.environ.setdefault('AUDIO_PROXY_POOL_SIZE', '256')
+else:
+    worker_class = 'sync'
+    # Sync workers hold a request (and any audio stream) for its whole duration
+    timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import random
+import threading
+import local_db
+
+
+class JobQueue:
+    """
+    Durable background jobs for slow storage operations
+    Jobs live in a local SQLite file shared by all gunicorn workers, and
+    every worker runs a small pool of threads that claim them. A claimed job
+    holds a lease that a heartbeat extends while its handler runs; jobs whose
+    lease runs out (e.g. the worker was restarted) are picked up again.
+    Jobs that fail with a retryable error (by default network errors) are
+    retried with backoff, so handlers must be idempotent; any other error
+    fails the job at once.
+    """
+    
+    def __init__(self, db_path='jobs.db', workers=2, max_attempts=3, lease_seconds=300, poll_interval=1.0,
+                 retention_seconds=7 * 24 * 3600, retryable=None):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.retryable = retryable or (lambda error: isinstance(error, (ConnectionError, TimeoutError)))
+        self.handlers = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        # IDs of the jobs this process's threads are running, kept leased by the heartbeat
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    run_after REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, run_after);
+            """)
+    
+    def _conn(self):
+        """Per-thread SQLite connection"""
+        return local_db.connection(self._local, self.db_path)
+    
+    def register(self, kind, handler):
+        """
+        Register handler(payload, progress) for a job kind
+        progress(done, total, message) records progress; the handler's return
+        value (JSON-serializable) is stored as the result.
+        """
+        self.handlers[kind] = handler
+    
+    def start(self):
+        """Start this process's worker threads"""
+        # Finished jobs are only kept around for status lookups
+        self._conn().execute(
+            "DELETE FROM jobs WHERE state IN ('succeeded', 'failed') AND updated_at < ?",
+            (time.time() - self.retention_seconds,)
+        )
+        
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        atexit.register(self.shutdown)
+    
+    def enqueue(self, kind, payload):
+        """Queue a job and return its ID (returns immediately)"""
+        if kind not in self.handlers:
+            raise Exception(f"Unknown job kind: {kind}")
+        
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            'INSERT INTO jobs (id, kind, payload, run_after, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, json.dumps(payload), now, now, now)
+        )
+        self._wakeup.set()
+        return job_id
+    
+    def get(self, job_id):
+        """Job status as a dict, or None if unknown"""
+        row = self._conn().execute(
+            'SELECT id, kind, state, attempts, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        job_id, kind, state, attempts, progress, result, error, created_at, updated_at = row
+        return {
+            'id': job_id,
+            'kind': kind,
+            'state': state,
+            'attempts': attempts,
+            'progress': json.loads(progress) if progress else None,
+            'result': json.loads(result) if result else None,
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at
+        }
+    
+    def _claim(self):
+        """Take the oldest runnable job (or one whose lease expired), returns (id, kind, payload, attempts)"""
+        conn = self._conn()
+        now = time.time()
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute("""
+                SELECT id, kind, payload, attempts FROM jobs
+                WHERE (state = 'queued' AND run_after <= ?) OR (state = 'running' AND lease_until < ?)
+                ORDER BY created_at LIMIT 1
+            """, (now, now)).fetchone()
+            if row:
+                conn.execute("""
+                    UPDATE jobs SET state = 'running', attempts = attempts + 1,
+                        lease_owner = ?, lease_until = ?, updated_at = ?
+                    WHERE id = ?
+                """, (self._worker_id, now + self.lease_seconds, now, row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        if row is None:
+            return None
+        job_id, kind, payload, attempts = row
+        return job_id, kind, json.loads(payload), attempts + 1
+    
+    def _finish(self, job_id, state, result=None, error=None, run_after=None):
+        now = time.time()
+        self._conn().execute("""
+            UPDATE jobs SET state = ?, result = ?, error = ?, run_after = COALESCE(?, run_after),
+                lease_owner = NULL, lease_until = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+        """, (state, json.dumps(result) if result is not None else None, error, run_after, now, job_id, self._worker_id))
+    
+    def _run_job(self, job_id, kind, payload, attempt):
+        def progress(done, total, message=''):
+            now = time.time()
+            self._conn().execute("""
+                UPDATE jobs SET progress = ?, lease_until = ?, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+            """, (
+                json.dumps({'done': done, 'total': total, 'message': message}),
+                now + self.lease_seconds, now, job_id, self._worker_id
+            ))
+        
+        handler = self.handlers.get(kind)
+        if attempt > self.max_attempts:
+            # Lease expired on the last attempt (the worker died mid-job)
+            self._finish(job_id, 'failed', error='Worker stopped during the final attempt')
+            return
+        
+        with self._running_lock:
+            self._running.add(job_id)
+        try:
+            if handler is None:
+                raise Exception(f"Unknown job kind: {kind}")
+            result = handler(payload, progress)
+        except Exception as e:
+            # Permanent errors (album not found, name taken, bad input) would only fail again
+            if attempt < self.max_attempts and handler is not None and self.retryable(e):
+                delay = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"⚠️  Job {kind} {job_id[:8]} failed (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+                self._finish(job_id, 'queued', error=str(e), run_after=time.time() + delay)
+            else:
+                print(f"❌ Job {kind} {job_id[:8]} failed: {e}")
+                self._finish(job_id, 'failed', error=str(e))
+            return
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
+        
+        self._finish(job_id, 'succeeded', result=result)
+    
+    def _heartbeat(self):
+        """Extend the lease of every job this process is running, however long its handler takes"""
+        while not self._stopped.wait(self.lease_seconds / 3):
+            with self._running_lock:
+                running = list(self._running)
+            if not running:
+                continue
+            
+            now = time.time()
+            try:
+                self._conn().executemany("""
+                    UPDATE jobs SET lease_until = ?, updated_at = ?
+                    WHERE id = ? AND state = 'running' AND lease_owner = ?
+                """, [(now + self.lease_seconds, now, job_id, self._worker_id) for job_id in running])
+            except Exception as e:
+                print(f"⚠️  Error renewing job leases: {e}")
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"⚠️  Error claiming job: {e}")
+                job = None
+            
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            
+            self._run_job(*job)
+    
+    def shutdown(self):
+        """Stop claiming new jobs (running jobs are resumed elsewhere once their lease expires)"""
+        self._stopped.set()
+        self._wakeup.set()
@@ -0,0 +1,218 @@
+import atexit
+import threading
+import file_lock
+import local_db
+from collections import defaultdict
+
+
+class LikeAggregator:
+    """
+    Write-behind aggregator for track likes
+    Likes live in a local SQLite file shared by all gunicorn workers: a
+    (album, track, user) primary key gives set membership, and every toggle
+    also upserts a compacted pending delta (last action per user wins).
+    Deltas are flushed to social_data.json on a timer, when the pending
+    count reaches a threshold, and at process exit.
+    """
+    
+    def __init__(self, manager, db_path='likes.db', flush_interval=10.0, flush_threshold=100):
+        self.manager = manager
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._local = threading.local()
+        self._flush_requested = threading.Event()
+        self._stopped = threading.Event()
+        
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS likes (
+                    album TEXT NOT NULL,
+                    track INTEGER NOT NULL,
+                    user_id TEXT NOT NULL,
+                    PRIMARY KEY (album, track, user_id)
+                );
+                CREATE TABLE IF NOT EXISTS pending (
+                    album TEXT NOT NULL,
+                    track INTEGER NOT NULL,
+                    user_id TEXT NOT NULL,
+                    liked INTEGER NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    PRIMARY KEY (album, track, user_id)
+                );
+                CREATE TABLE IF NOT EXISTS seeded (
+                    album TEXT NOT NULL,
+                    track INTEGER NOT NULL,
+                    PRIMARY KEY (album, track)
+                );
+            """)
+        
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+    
+    def _conn(self):
+        """Per-thread SQLite connection"""
+        return local_db.connection(self._local, self.db_path)
+    
+    def _ensure_seeded(self, album_name, track_number):
+        """Load a track's existing likes from R2 the first time it is touched"""
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT 1 FROM seeded WHERE album = ? AND track = ?', (album_name, track_number)
+        ).fetchone()
+        if row:
+            return
+        
+        social_path = self.manager._get_file_path(album_name, track_number, 'social_data')
+        social_data = self.manager._download_json(social_path) or {}
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another worker may have seeded while we were downloading
+            row = conn.execute(
+                'SELECT 1 FROM seeded WHERE album = ? AND track = ?', (album_name, track_number)
+            ).fetchone()
+            if not row:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO likes (album, track, user_id) VALUES (?, ?, ?)',
+                    [(album_name, track_number, user_id) for user_id in social_data.get('likes', [])]
+                )
+                conn.execute('INSERT INTO seeded (album, track) VALUES (?, ?)', (album_name, track_number))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    
+    def toggle(self, album_name, track_number, user_id):
+        """Toggle a like and return {'liked', 'count'} without touching R2"""
+        self._ensure_seeded(album_name, track_number)
+        conn = self._conn()
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            deleted = conn.execute(
+                'DELETE FROM likes WHERE album = ? AND track = ? AND user_id = ?',
+                (album_name, track_number, user_id)
+            ).rowcount
+            liked = not deleted
+            if liked:
+                conn.execute(
+                    'INSERT INTO likes (album, track, user_id) VALUES (?, ?, ?)',
+                    (album_name, track_number, user_id)
+                )
+            
+            conn.execute("""
+                INSERT INTO pending (album, track, user_id, liked) VALUES (?, ?, ?, ?)
+                ON CONFLICT (album, track, user_id)
+                DO UPDATE SET liked = excluded.liked, version = version + 1
+            """, (album_name, track_number, user_id, int(liked)))
+            
+            count = conn.execute(
+                'SELECT COUNT(*) FROM likes WHERE album = ? AND track = ?', (album_name, track_number)
+            ).fetchone()[0]
+            pending = conn.execute('SELECT COUNT(*) FROM pending').fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        if pending >= self.flush_threshold:
+            self._flush_requested.set()
+        
+        return {'liked': liked, 'count': count}
+    
+    def get_counts(self, album_name):
+        """Live like counts for every seeded track of an album, {track: count}"""
+        rows = self._conn().execute("""
+            SELECT seeded.track, COUNT(likes.user_id) FROM seeded
+            LEFT JOIN likes ON likes.album = seeded.album AND likes.track = seeded.track
+            WHERE seeded.album = ?
+            GROUP BY seeded.track
+        """, (album_name,)).fetchall()
+        return dict(rows)
+    
+    def forget_album(self, album_name):
+        """Drop local state for a deleted album, after any flush in progress has finished"""
+        # A flush that already read this album's deltas would otherwise write them back behind the delete
+        lock_file = open(f"{self.db_path}.flush.lock", 'w')
+        try:
+            file_lock.acquire(lock_file)
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for table in ('likes', 'pending', 'seeded'):
+                    conn.execute(f'DELETE FROM {table} WHERE album = ?', (album_name,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            lock_file.close()
+    
+    def flush(self, wait=False):
+        """Write all pending deltas to R2, returns the number of deltas flushed"""
+        # Only one worker flushes at a time
+        lock_file = open(f"{self.db_path}.flush.lock", 'w')
+        try:
+            # Waiting polls, so a gevent worker isn't stalled while another process flushes
+            if not file_lock.acquire(lock_file, None if wait else 0):
+                return 0
+            
+            conn = self._conn()
+            rows = conn.execute('SELECT album, track, user_id, liked, version FROM pending').fetchall()
+            
+            by_track = defaultdict(list)
+            for album_name, track_number, user_id, liked, version in rows:
+                by_track[(album_name, track_number)].append((user_id, bool(liked), version))
+            
+            flushed = 0
+            for (album_name, track_number), deltas in by_track.items():
+                try:
+                    self.manager.apply_like_deltas(
+                        album_name, track_number, {user_id: liked for user_id, liked, _ in deltas}
+                    )
+                except Exception as e:
+                    print(f"⚠️  Error flushing likes for {album_name} Track {track_number}: {e}")
+                    continue
+                
+                # Only clear deltas that did not change while we were writing
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany(
+                        'DELETE FROM pending WHERE album = ? AND track = ? AND user_id = ? AND version = ?',
+                        [(album_name, track_number, user_id, version) for user_id, _, version in deltas]
+                    )
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                flushed += len(deltas)
+            
+            if flushed:
+                print(f"💾 Flushed {flushed} like changes to R2")
+            return flushed
+        finally:
+            lock_file.close()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️  Error flushing likes: {e}")
+    
+    def shutdown(self):
+        """Stop the flush thread and write out anything pending"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._flush_requested.set()
+        try:
+            self.flush(wait=True)
+        except Exception as e:
+            print(f"⚠️  Error flushing likes on shutdown: {e}")
@@ -0,0 +1,17 @@
+import sqlite3
+
+
+def connection(local, db_path):
+    """
+    Per-thread connection to a local SQLite file shared by gunicorn workers
+    local is the caller's threading.local(). Connections run in autocommit
+    mode (callers open their own BEGIN IMMEDIATE transactions) with WAL so
+    readers in other workers never block on a writer.
+    """
+    conn = getattr(local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        local.conn = conn
+    return conn
@@ -0,0 +1,504 @@
+import json
+import time
+import uuid
+import atexit
+import sqlite3
+import hashlib
+import threading
+import file_lock
+import local_db
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+_MISSING = object()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _identity(item):
+    """What makes two list items the same item (comments by ID, anything else by value)"""
+    if isinstance(item, dict) and 'id' in item:
+        return ('id', json.dumps(item['id']))
+    return ('value', json.dumps(item, sort_keys=True))
+
+
+def merge_json(base, local, remote):
+    """
+    Three-way merge of a JSON value changed locally and remotely since base
+    Dicts merge key by key and lists keep both sides' additions and removals
+    (an item added on both sides under the same ID keeps theirs). Numbers
+    changed on both sides keep theirs: the counts in these documents are
+    derived from lists or other documents, so adding up both sides' changes
+    would count the same like or comment twice - callers recompute the ones
+    they can from the merged result. Any other value changed on both sides
+    keeps ours.
+    """
+    if local == remote or remote == base:
+        return local
+    if local == base:
+        return remote
+    
+    if isinstance(local, dict) and isinstance(remote, dict):
+        base = base if isinstance(base, dict) else {}
+        merged = {}
+        for key in list(remote) + [key for key in local if key not in remote]:
+            value = merge_json(base.get(key, _MISSING), local.get(key, _MISSING), remote.get(key, _MISSING))
+            if value is not _MISSING:
+                merged[key] = value
+        return merged
+    
+    if isinstance(local, list) and isinstance(remote, list):
+        base_items = {_identity(item): item for item in (base if isinstance(base, list) else [])}
+        local_items = {_identity(item): item for item in local}
+        remote_items = {_identity(item): item for item in remote}
+        
+        merged = []
+        for identity, item in remote_items.items():
+            if identity in base_items:
+                if identity not in local_items:
+                    continue  # removed locally
+                item = merge_json(base_items[identity], local_items[identity], item)
+            merged.append(item)
+        merged.extend(
+            item for identity, item in local_items.items()
+            if identity not in base_items and identity not in remote_items
+        )
+        
+        # Lists of numbered items (comment segments) stay in ID order
+        if merged and all(isinstance(item, dict) and _is_number(item.get('id')) for item in merged):
+            merged.sort(key=lambda item: item['id'])
+        return merged
+    
+    if _is_number(local) and _is_number(remote):
+        return remote
+    return local
+
+
+class MetadataStore:
+    """
+    Local SQLite store for JSON metadata, authoritative on this host
+    Every JSON document R2Manager reads or writes (album metadata, track_info,
+    manifests, social data, comment segments, the album index) is a row in a file
+    shared by all gunicorn workers. A document this host has never seen is
+    loaded from R2 on first read (a missing one is remembered as missing).
+    Changed documents are written back to their R2 keys on a timer and at
+    process exit, so the bucket stays a snapshot a fresh disk can reload from.
+    ETags are the MD5 of the body (as R2 computes them) and a failed
+    conditional write raises the same PreconditionFailed error R2 would.
+    
+    Only one host may hold metadata locally: a lease object in R2, renewed on
+    its own timer, names the instance whose store is authoritative. While
+    another instance holds it (scale-out, overlapping deploys, a CLI run from
+    another machine) and nothing here is waiting to be written back, the store
+    is inactive and R2Manager reads and writes R2 directly. Write-back is
+    conditional on the R2 ETag a document was loaded or last synced with; if
+    R2 changed underneath, both versions are merged against the one we last
+    saw there (see merge_json) and the result is written back.
+    
+    Comment heads stay in R2 only: comment IDs are handed out by a conditional
+    write there, so two hosts can never give different comments the same ID.
+    """
+    
+    # SQLite's bound-parameter limit is 999 on older builds
+    QUERY_CHUNK = 500
+    # Not a .json key, so the lease itself always lives in R2 only
+    LEASE_KEY = 'metadata-store.lease'
+    # Renewed every third of this, independently of document write-back
+    LEASE_SECONDS = 30.0
+    # The holder stops trusting its lease this long before it runs out (clock skew between hosts)
+    LEASE_MARGIN = 5.0
+    
+    def __init__(self, manager, db_path='metadata.db', sync_interval=10.0, background=True):
+        self.manager = manager
+        self.db_path = db_path
+        self.sync_interval = sync_interval
+        self._local = threading.local()
+        self._sync_requested = threading.Event()
+        self._stopped = threading.Event()
+        # Set once the first lease renewal has finished
+        self.ready = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'reads': 0, 'loads': 0, 'writes': 0, 'conflicts': 0,
+            'synced': 0, 'sync_conflicts': 0, 'sync_errors': 0
+        }
+        
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    key TEXT PRIMARY KEY,
+                    album TEXT,
+                    body TEXT,
+                    etag TEXT,
+                    revision INTEGER NOT NULL DEFAULT 0,
+                    synced_revision INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS documents_album ON documents (album);
+                CREATE INDEX IF NOT EXISTS documents_dirty ON documents (key) WHERE revision > synced_revision;
+                CREATE TABLE IF NOT EXISTS lease (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    instance_id TEXT NOT NULL,
+                    expires_at REAL NOT NULL DEFAULT 0,
+                    etag TEXT
+                );
+            """)
+            # r2_etag: ETag a document was loaded or last synced with (NULL = not in R2, '*' = overwrite it)
+            # base: the body R2 had at r2_etag, what conflicting changes are merged against
+            for column in ('r2_etag TEXT', 'base TEXT'):
+                try:
+                    conn.execute(f'ALTER TABLE documents ADD COLUMN {column}')
+                except sqlite3.OperationalError:
+                    pass
+            # Every worker sharing this file is the same instance as far as the lease goes
+            conn.execute('INSERT OR IGNORE INTO lease (id, instance_id) VALUES (1, ?)', (uuid.uuid4().hex,))
+        
+        # Without background threads (CLI maintenance) the store never takes the lease and only syncs when asked
+        if background:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            self._lease_thread = threading.Thread(target=self._run_lease, daemon=True)
+            self._lease_thread.start()
+            atexit.register(self.shutdown)
+    
+    def _conn(self):
+        """Per-thread SQLite connection"""
+        return local_db.connection(self._local, self.db_path)
+    
+    def _record(self, stat, value=1):
+        with self._stats_lock:
+            self.stats[stat] += value
+    
+    # Documents written to R2 directly even while the store is active
+    R2_ONLY_SUFFIXES = ('comments/head.json',)
+    
+    @classmethod
+    def handles(cls, key):
+        """True for the objects kept here (JSON documents; media and comment heads stay in R2 only)"""
+        return key.endswith('.json') and not key.endswith(cls.R2_ONLY_SUFFIXES)
+    
+    @staticmethod
+    def _album(key):
+        parts = key.split('/')
+        return parts[1] if len(parts) > 2 and parts[0] == 'albums' else None
+    
+    @staticmethod
+    def _etag(body):
+        return f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"'
+    
+    def active(self):
+        """True while this host holds the lease or has changes to write back - otherwise R2Manager goes to R2"""
+        expires_at, dirty = self._conn().execute(
+            'SELECT expires_at, EXISTS (SELECT 1 FROM documents WHERE revision > synced_revision) FROM lease'
+        ).fetchone()
+        return bool(dirty) or expires_at - self.LEASE_MARGIN > time.time()
+    
+    def get(self, key):
+        """Return (body, etag) - (None, None) if known to be missing - or None if never loaded"""
+        row = self._conn().execute('SELECT body, etag FROM documents WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self._record('reads')
+        return row
+    
+    def get_many(self, keys):
+        """{key: (body, etag)} for the keys that have been loaded (one indexed query per chunk)"""
+        keys = list(keys)
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(keys), self.QUERY_CHUNK):
+            chunk = keys[start:start + self.QUERY_CHUNK]
+            rows = conn.execute(
+                f"SELECT key, body, etag FROM documents WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update((key, (body, etag)) for key, body, etag in rows)
+        self._record('reads', len(found))
+        return found
+    
+    def load(self, key, body, r2_etag=None):
+        """Record a document as read from R2 (body None = missing), returns the stored (body, etag)"""
+        self._conn().execute("""
+            INSERT OR IGNORE INTO documents (key, album, body, etag, r2_etag, base, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (key, self._album(key), body, self._etag(body) if body is not None else None, r2_etag, body, time.time()))
+        self._record('loads')
+        # Another worker may have loaded or written it first
+        return self.get(key)
+    
+    def put(self, key, body, if_match=None, if_none_match=None):
+        """
+        Write a document, returns its new ETag
+        Conditions are checked against the local row, so a document must have
+        been loaded (see get/load) before it is written conditionally.
+        """
+        etag = self._etag(body)
+        conn = self._conn()
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT etag FROM documents WHERE key = ?', (key,)).fetchone()
+            current = row[0] if row else None
+            if (if_match and current != if_match) or (if_none_match == '*' and current):
+                self._record('conflicts')
+                raise ClientError(
+                    {'Error': {'Code': 'PreconditionFailed', 'Message': 'PreconditionFailed'},
+                     'ResponseMetadata': {'HTTPStatusCode': 412}},
+                    'PutObject'
+                )
+            self._upsert(conn, key, body, etag)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        self._record('writes')
+        return etag
+    
+    def put_many(self, items):
+        """Write several (key, body) documents unconditionally in one transaction"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for key, body in items:
+                self._upsert(conn, key, body, self._etag(body))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        self._record('writes', len(items))
+    
+    def _upsert(self, conn, key, body, etag):
+        # A document written without being loaded first replaces whatever R2 has
+        conn.execute("""
+            INSERT INTO documents (key, album, body, etag, r2_etag, revision, updated_at) VALUES (?, ?, ?, ?, '*', 1, ?)
+            ON CONFLICT (key) DO UPDATE SET body = excluded.body, etag = excluded.etag,
+                revision = revision + 1, updated_at = excluded.updated_at
+        """, (key, self._album(key), body, etag, time.time()))
+    
+    def forget_album(self, album_name):
+        """Drop every local document of an album (the next read loads it from R2 again)"""
+        self._conn().execute('DELETE FROM documents WHERE album = ?', (album_name,))
+    
+    def sync(self, wait=False):
+        """Write changed documents back to R2, returns the number written"""
+        # Only one worker syncs at a time
+        lock_file = open(f"{self.db_path}.sync.lock", 'w')
+        try:
+            # Waiting polls, so a gevent worker isn't stalled while another process syncs
+            if not file_lock.acquire(lock_file, None if wait else 0):
+                return 0
+            
+            rows = self._conn().execute(
+                'SELECT key, body, revision, r2_etag FROM documents WHERE revision > synced_revision'
+            ).fetchall()
+            if not rows:
+                return 0
+            
+            written, conflicted, errors = self._write_back(rows)
+            
+            # Someone else changed these in R2 - merge and write them again (still conditional)
+            merged = []
+            for key in conflicted:
+                try:
+                    merged.append(self._merge_remote(key))
+                except Exception as e:
+                    print(f"⚠️  Error merging {key} with R2: {e}")
+                    errors += 1
+            if merged:
+                rewritten, _, rewrite_errors = self._write_back(merged)
+                written += rewritten
+                errors += rewrite_errors
+            
+            self._record('synced', written)
+            self._record('sync_conflicts', len(conflicted))
+            self._record('sync_errors', errors)
+            print(f"💾 Synced {written} metadata documents to R2")
+            return written
+        finally:
+            lock_file.close()
+    
+    def _write_back(self, rows):
+        """PUT (key, body, revision, r2_etag) rows to R2, returns (written, conflicted keys, errors)"""
+        def write(row):
+            key, body, revision, r2_etag = row
+            # Never overwrite a version of the object we haven't seen
+            if r2_etag == '*':
+                conditions = {}
+            elif r2_etag:
+                conditions = {'if_match': r2_etag}
+            else:
+                conditions = {'if_none_match': '*'}
+            try:
+                return row, self.manager._put_json_content(key, body, **conditions), None
+            except Exception as e:
+                return row, None, e
+        
+        if self._stopped.is_set():
+            # Thread pools can't be started once the interpreter is exiting
+            results = [write(row) for row in rows]
+        else:
+            workers = min(self.manager.max_workers, len(rows))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(write, rows))
+        
+        written = []
+        conflicted = []
+        errors = 0
+        for (key, body, revision, _), r2_etag, error in results:
+            if error is None:
+                written.append((revision, r2_etag, body, key, revision))
+            elif self.manager._is_precondition_failure(error):
+                conflicted.append(key)
+            else:
+                print(f"⚠️  Error syncing {key} to R2: {error}")
+                errors += 1
+        
+        # A document rewritten while we were uploading stays dirty for the next round
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'UPDATE documents SET synced_revision = ?, r2_etag = ?, base = ? WHERE key = ? AND revision >= ?',
+                written
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(written), conflicted, errors
+    
+    def _merge_remote(self, key):
+        """Merge R2's current version of a document into ours, returns the row to write back"""
+        fetched = self.manager._fetch_document(key)
+        remote, r2_etag = fetched if fetched else (None, None)
+        
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            body, base = conn.execute('SELECT body, base FROM documents WHERE key = ?', (key,)).fetchone()
+            if remote is not None:
+                body = self.manager._merge_document(key, base, body, remote)
+            conn.execute("""
+                UPDATE documents SET body = ?, etag = ?, r2_etag = ?, base = ?, revision = revision + 1, updated_at = ?
+                WHERE key = ?
+            """, (body, self._etag(body), r2_etag, remote, time.time(), key))
+            revision = conn.execute('SELECT revision FROM documents WHERE key = ?', (key,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        print(f"🔀 Merged {key} with changes another instance made in R2")
+        return key, body, revision, r2_etag
+    
+    def _renew_lease(self):
+        """Extend this host's lease, or take it if it is free - returns True while we hold it"""
+        # One worker per host renews; the others read the outcome from the lease table
+        lock_file = open(f"{self.db_path}.lease.lock", 'w')
+        try:
+            if not file_lock.acquire(lock_file, 0):
+                return self.active()
+            
+            conn = self._conn()
+            instance_id, etag = conn.execute('SELECT instance_id, etag FROM lease').fetchone()
+            expires_at = time.time() + self.LEASE_SECONDS
+            body = json.dumps({'owner': instance_id, 'expires_at': expires_at})
+            
+            if etag:
+                # Unchanged since our last renewal means nobody else has taken it
+                try:
+                    self._hold_lease(self.manager._put_json_content(self.LEASE_KEY, body, if_match=etag), expires_at)
+                    return True
+                except ClientError as e:
+                    if not self.manager._is_precondition_failure(e):
+                        raise
+            
+            fetched = self.manager._fetch_document(self.LEASE_KEY)
+            if fetched:
+                lease = json.loads(fetched[0])
+                if lease['owner'] != instance_id and lease['expires_at'] > time.time():
+                    self._hold_lease(None, 0)
+                    return False
+            
+            try:
+                if fetched:
+                    etag = self.manager._put_json_content(self.LEASE_KEY, body, if_match=fetched[1])
+                else:
+                    etag = self.manager._put_json_content(self.LEASE_KEY, body, if_none_match='*')
+            except ClientError as e:
+                if not self.manager._is_precondition_failure(e):
+                    raise
+                # Another instance took it first
+                self._hold_lease(None, 0)
+                return False
+            
+            self._hold_lease(etag, expires_at)
+            return True
+        finally:
+            lock_file.close()
+    
+    def _hold_lease(self, etag, expires_at):
+        """Record the outcome of a renewal, shared by every worker on this host"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            held_until = conn.execute('SELECT expires_at FROM lease').fetchone()[0]
+            if expires_at and held_until - self.LEASE_MARGIN <= time.time():
+                # R2 may have changed while we weren't the holder - reload whatever isn't waiting to sync
+                conn.execute('DELETE FROM documents WHERE revision <= synced_revision')
+            conn.execute('UPDATE lease SET expires_at = ?, etag = ?', (expires_at, etag))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._sync_requested.wait(self.sync_interval)
+            self._sync_requested.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"⚠️  Error syncing metadata: {e}")
+    
+    def _run_lease(self):
+        # The storage client is built by warm-up or the first request, never for the lease alone
+        while not self.manager.client_ready.wait(1.0):
+            if self._stopped.is_set():
+                return
+        
+        # A host that is shutting down lets its lease run out for the next one
+        while not self._stopped.is_set():
+            try:
+                self._renew_lease()
+            except Exception as e:
+                print(f"⚠️  Error renewing the metadata store lease: {e}")
+            self.ready.set()
+            self._stopped.wait(self.LEASE_SECONDS / 3)
+    
+    def shutdown(self):
+        """Stop the sync thread and write out anything changed"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._sync_requested.set()
+        try:
+            self.sync(wait=True)
+        except Exception as e:
+            print(f"⚠️  Error syncing metadata on shutdown: {e}")
+    
+    def get_stats(self):
+        conn = self._conn()
+        documents, dirty = conn.execute(
+            'SELECT COUNT(*), COUNT(CASE WHEN revision > synced_revision THEN 1 END) FROM documents'
+        ).fetchone()
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['documents'] = documents
+        stats['dirty'] = dirty
+        stats['active'] = int(self.active())
+        return stats
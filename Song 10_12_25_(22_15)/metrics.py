@@ -0,0 +1,315 @@
+import os
+import time
+import bisect
+import threading
+import contextvars
+from botocore.exceptions import ClientError
+
+# Latency buckets (seconds) shared by storage calls and HTTP routes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Storage timing of the request being handled (None outside requests)
+_current_timer = contextvars.ContextVar('request_timer', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {} if labels else {(): 0}
+        self._lock = threading.Lock()
+    
+    def inc(self, *label_values, value=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + value
+    
+    def render(self, kind='counter'):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {kind}"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *label_values, value=1):
+        self.inc(*label_values, value=-value)
+    
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+    
+    def render(self):
+        return super().render('gauge')
+
+
+class Histogram:
+    """Fixed-bucket histogram: constant memory per label set, O(log buckets) per observation"""
+    
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, *label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    labels = _format_labels(self.labels, label_values, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class RequestTimer:
+    """
+    Storage time of one HTTP request
+    Overlapping calls from parallel fan-out are counted once, so storage_seconds
+    is the wall time spent waiting on R2 and never exceeds the request's total.
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.storage_seconds = 0.0
+        self.storage_calls = 0
+        self._in_flight = 0
+        self._busy_since = None
+        self._lock = threading.Lock()
+    
+    def call_started(self):
+        with self._lock:
+            self.storage_calls += 1
+            if self._in_flight == 0:
+                self._busy_since = time.perf_counter()
+            self._in_flight += 1
+    
+    def call_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self.storage_seconds += time.perf_counter() - self._busy_since
+    
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class Metrics:
+    """
+    In-process metrics registry rendered in Prometheus text format
+    Values are per process (the Procfile runs a single gunicorn worker).
+    Label sets are bounded: storage operation names, result codes and Flask
+    route rules, never raw keys or URLs.
+    """
+    
+    def __init__(self):
+        self.storage_requests = Counter(
+            'r2_requests_total', 'R2 API calls by operation and result', ('operation', 'result')
+        )
+        self.storage_latency = Histogram(
+            'r2_request_duration_seconds', 'R2 API call latency', ('operation',)
+        )
+        self.storage_bytes_sent = Counter(
+            'r2_bytes_sent_total', 'Bytes uploaded to R2', ('operation',)
+        )
+        self.storage_bytes_received = Counter(
+            'r2_bytes_received_total', 'Bytes downloaded from R2 (object size of successful GETs)', ('operation',)
+        )
+        self.http_requests = Counter(
+            'http_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status')
+        )
+        self.http_latency = Histogram(
+            'http_request_duration_seconds', 'HTTP request latency (time to response headers)', ('route',)
+        )
+        self.http_storage_latency = Histogram(
+            'http_request_storage_seconds', 'Wall time each HTTP request spent waiting on R2', ('route',)
+        )
+        self.proxy_streams = Gauge(
+            'audio_proxy_streams_in_flight', 'Upstream audio proxy streams currently open'
+        )
+        self.startup = Gauge(
+            'app_startup_seconds', 'Time spent in each startup phase of this process', ('phase',)
+        )
+        self._collectors = []
+    
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines at scrape time"""
+        self._collectors.append(collector)
+    
+    def render(self):
+        lines = []
+        for metric in (
+            self.storage_requests, self.storage_latency, self.storage_bytes_sent, self.storage_bytes_received,
+            self.http_requests, self.http_latency, self.http_storage_latency, self.proxy_streams, self.startup
+        ):
+            lines.extend(metric.render())
+        
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"⚠️  Error collecting metrics: {e}")
+        return '\n'.join(lines) + '\n'
+    
+    # Per-request storage timing
+    
+    def start_request(self):
+        """Begin timing storage calls for the current request, returns a reset token"""
+        return _current_timer.set(RequestTimer())
+    
+    def current_request(self):
+        return _current_timer.get()
+    
+    def end_request(self, token):
+        _current_timer.reset(token)
+    
+    def bind_request(self, fn):
+        """Wrap fn so calls on pool threads count towards the calling request"""
+        timer = _current_timer.get()
+        if timer is None:
+            return fn
+        
+        def bound(*args, **kwargs):
+            token = _current_timer.set(timer)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_timer.reset(token)
+        return bound
+    
+    def observe_storage_call(self, operation, started, result, sent=0, received=0):
+        self.storage_requests.inc(operation, result)
+        self.storage_latency.observe(operation, value=time.perf_counter() - started)
+        if sent:
+            self.storage_bytes_sent.inc(operation, value=sent)
+        if received:
+            self.storage_bytes_received.inc(operation, value=received)
+
+
+def stats_collector(name, help_text, get_stats, counters, gauges=()):
+    """Expose a component's get_stats() dict as one labelled counter plus gauges"""
+    def collect():
+        stats = get_stats()
+        lines = [f"# HELP {name}_events_total {help_text}", f"# TYPE {name}_events_total counter"]
+        lines.extend(f'{name}_events_total{{event="{key}"}} {stats[key]}' for key in counters)
+        for key in gauges:
+            lines.append(f"# TYPE {name}_{key} gauge")
+            lines.append(f"{name}_{key} {stats[key]}")
+        return lines
+    return collect
+
+
+def _body_size(body):
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    try:
+        return os.fstat(body.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+class InstrumentedPaginator:
+    """Paginator whose page fetches are timed as list_objects_v2 calls"""
+    
+    def __init__(self, paginator, client, operation):
+        self._paginator = paginator
+        self._client = client
+        self._operation = operation
+    
+    def paginate(self, **kwargs):
+        pages = iter(self._paginator.paginate(**kwargs))
+        while True:
+            try:
+                page = self._client._timed(self._operation, lambda: next(pages), {})
+            except StopIteration:
+                return
+            yield page
+
+
+class InstrumentedS3Client:
+    """
+    Wraps a boto3 S3 client: every network call is counted, timed and sized
+    Calls are also charged to the current request's RequestTimer.
+    Anything that is not a storage round-trip (e.g. presigning) passes through.
+    """
+    
+    OPERATIONS = {
+        'head_object', 'get_object', 'put_object', 'copy_object', 'list_objects_v2',
+        'delete_object', 'delete_objects', 'create_multipart_upload', 'upload_part',
+        'complete_multipart_upload', 'abort_multipart_upload'
+    }
+    
+    def __init__(self, client, metrics):
+        self._client = client
+        self._metrics = metrics
+    
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in self.OPERATIONS:
+            return lambda **kwargs: self._timed(name, lambda: attr(**kwargs), kwargs)
+        return attr
+    
+    def get_paginator(self, operation_name):
+        return InstrumentedPaginator(self._client.get_paginator(operation_name), self, operation_name)
+    
+    def _timed(self, operation, call, kwargs):
+        timer = _current_timer.get()
+        if timer:
+            timer.call_started()
+        started = time.perf_counter()
+        sent = _body_size(kwargs['Body']) if 'Body' in kwargs else 0
+        
+        try:
+            response = call()
+        except ClientError as e:
+            # Conditional misses (304/412) and NoSuchKey are expected results, not failures
+            code = e.response.get('Error', {}).get('Code', 'Unknown')
+            self._metrics.observe_storage_call(operation, started, code, sent=sent)
+            raise
+        except StopIteration:
+            # Paginator exhausted - no request was made
+            raise
+        except Exception as e:
+            self._metrics.observe_storage_call(operation, started, type(e).__name__, sent=sent)
+            raise
+        finally:
+            if timer:
+                timer.call_finished()
+        
+        received = response.get('ContentLength', 0) if operation == 'get_object' else 0
+        self._metrics.observe_storage_call(operation, started, 'ok', sent=sent, received=received)
+        return response
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -1,8 +1,261 @@
-import boto3
-from botocore.client import Config
+from botocore.exceptions import ClientError, HTTPClientError, ConnectionError as BotoConnectionError
 import os
 import json
 import io
+import shutil
+import tempfile
+import time
+import traceback
+import random
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from like_aggregator import LikeAggregator
+from metadata_store import MetadataStore, merge_json
+from single_flight import SingleFlight
+from metrics import metrics, InstrumentedS3Client
+
+
+class ObjectCache:
+    """
+    Bounded LRU/TTL cache for small R2 objects
+    Entries older than the TTL are revalidated with their stored ETag
+    """
+    
+    def __init__(self, max_entries=512, ttl=5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0, 'invalidations': 0}
+    
+    def get(self, key):
+        """Return (value, etag, fresh) or None if the key is not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            value, etag, stored_at = entry
+            return value, etag, (time.monotonic() - stored_at) < self.ttl
+    
+    def put(self, key, value, etag=None):
+        with self._lock:
+            self._entries[key] = (value, etag, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def record(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats['invalidations'] += 1
+    
+    def invalidate_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+                self.stats['invalidations'] += 1
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['ttl'] = self.ttl
+            return stats
+
+
+class MultipartUploadWriter:
+    """
+    Writable stream that uploads to R2 as it is written
+    Full parts are uploaded in parallel; writes block while max_in_flight
+    parts are pending, so memory stays bounded regardless of file size.
+    Small files that never fill a part are sent with a single put_object.
+    """
+    
+    MIN_PART_SIZE = 5 * 1024 * 1024  # S3/R2 minimum for all but the last part
+    
+    def __init__(self, manager, key, content_type, part_size=8 * 1024 * 1024, max_in_flight=4, capture_limit=0):
+        self.manager = manager
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.size = 0
+        self.upload_id = None
+        self._buffer = bytearray()
+        self._futures = []
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._max_in_flight = max_in_flight
+        # Small text files (lyrics) are also kept in memory so they can be stored in lyrics.json
+        self.capture_limit = capture_limit
+        self._captured = bytearray()
+    
+    def write(self, data):
+        if self.size + len(data) <= self.capture_limit:
+            self._captured += data
+        self._buffer += data
+        self.size += len(data)
+        
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(part)
+    
+    def _submit_part(self, data):
+        if self.upload_id is None:
+            response = self.manager.s3.create_multipart_upload(
+                Bucket=self.manager.bucket_name,
+                Key=self.key,
+                ContentType=self.content_type
+            )
+            self.upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=self._max_in_flight)
+        
+        # Backpressure: wait for a free slot before buffering another part
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        self._futures.append(self._executor.submit(metrics.bind_request(self._upload_part), part_number, data))
+    
+    def _upload_part(self, part_number, data):
+        try:
+            response = self.manager.s3.upload_part(
+                Bucket=self.manager.bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=data
+            )
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        """Finish the upload (raises if any part failed)"""
+        if self.upload_id is None:
+            self.manager.s3.put_object(
+                Bucket=self.manager.bucket_name,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type
+            )
+            self._buffer = bytearray()
+            return
+        
+        try:
+            if self._buffer:
+                self._submit_part(bytes(self._buffer))
+                self._buffer = bytearray()
+            
+            parts = [future.result() for future in self._futures]
+            self.manager.s3.complete_multipart_upload(
+                Bucket=self.manager.bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._executor.shutdown(wait=False)
+    
+    def captured_text(self):
+        """The written file as text, or None if it was over capture_limit"""
+        if self.size > self.capture_limit:
+            return None
+        return self._captured.decode('utf-8', 'replace')
+    
+    def abort(self):
+        """Abandon the upload and release any uploaded parts"""
+        self._buffer = bytearray()
+        if self.upload_id is None:
+            return
+        
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        
+        try:
+            self.manager.s3.abort_multipart_upload(
+                Bucket=self.manager.bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id
+            )
+        except Exception as e:
+            print(f"⚠️  Error aborting upload {self.key}: {e}")
+        self.upload_id = None
+
+
+class TrackInfoBatch:
+    """
+    Pending changes to one track_info.json
+    Changes are queued in memory and applied on commit() with a single
+    GET and a single PUT, however many fields a request touches.
+    """
+    
+    def __init__(self, manager, album_name, track_number):
+        self.manager = manager
+        self.album_name = album_name
+        self.track_number = track_number
+        self._changes = []
+        self._lyrics = []
+    
+    def set_metadata(self, track_name, artist_name):
+        def apply(track_info):
+            track_info['track_name'] = track_name
+            track_info['artist_name'] = artist_name
+        self._changes.append(apply)
+    
+    def set_file(self, file_type, style_key, text=None):
+        """Record an uploaded file and return its public URL (text: lyrics content for lyrics.json)"""
+        r2_path = self.manager._get_file_path(self.album_name, self.track_number, file_type, style_key)
+        file_url = f"{self.manager.public_url}/{r2_path}"
+        self._changes.append(
+            lambda track_info: self.manager._apply_track_file(track_info, file_type, style_key, file_url)
+        )
+        if file_type in self.manager.LYRICS_TYPES:
+            self._lyrics.append((file_type, style_key, text))
+        return file_url
+    
+    def set_youtube_link(self, file_type, style_key, video_id):
+        self._changes.append(
+            lambda track_info: self.manager._apply_youtube_link(track_info, file_type, style_key, video_id)
+        )
+        return f"youtube:{video_id}"
+    
+    def commit(self):
+        """Apply all queued changes with one read-modify-write of track_info.json"""
+        if not self._changes:
+            return None
+        
+        # Lyrics text first, so a track pointing at new lyrics never serves the old text
+        if self._lyrics:
+            self.manager._store_track_lyrics(self.album_name, self.track_number, self._lyrics)
+            self._lyrics = []
+        
+        track_path = self.manager._get_file_path(self.album_name, self.track_number, 'track_info')
+        
+        def apply_all(track_info):
+            for apply in self._changes:
+                apply(track_info)
+        
+        track_info, _ = self.manager._mutate_json(track_path, apply_all)
+        
+        if not track_info:
+            raise Exception("track_info.json not found")
+        
+        self.manager._patch_manifest_track(self.album_name, track_info)
+        self._changes = []
+        return track_info
+
 
 class R2Manager:
     """
@@ -10,8 +263,24 @@ class R2Manager:
     Replaces Google Drive for file storage
     """
     
-    def __init__(self):
-        """Initialize R2 client with credentials from environment"""
+    # Comments per append-only segment object
+    COMMENT_SEGMENT_SIZE = 50
+    
+    # Lyrics up to this size are copied into the track's lyrics.json, read only by get_track_lyrics
+    LYRICS_TYPES = ('lyrics', 'transition_lyrics')
+    LYRICS_INLINE_MAX_BYTES = 64 * 1024
+    
+    # R2 error codes that may succeed if the whole operation is tried again later
+    TRANSIENT_ERROR_CODES = ('SlowDown', 'RequestTimeout', 'InternalError', 'ServiceUnavailable', 'TooManyRequests')
+    
+    def __init__(self, s3_client=None, local_stores=False):
+        """
+        Initialize R2 client with credentials from environment
+        s3_client replaces the boto3 client (e.g. an in-process fake for benchmarks).
+        local_stores enables the metadata store and the like aggregator, which
+        keep state in local SQLite files and run background threads - only the
+        web server opts in; CLI commands always read and write R2 directly.
+        """
         
         # Get credentials from environment variables
         account_id = os.environ.get('R2_ACCOUNT_ID')
@@ -19,23 +288,126 @@ class R2Manager:
         secret_key = os.environ.get('R2_SECRET_KEY')
         bucket_name = os.environ.get('R2_BUCKET_NAME', 'music-wheel')
         
-        if not all([account_id, access_key, secret_key]):
+        if s3_client is None and not all([account_id, access_key, secret_key]):
             raise Exception("Missing R2 credentials! Set R2_ACCOUNT_ID, R2_ACCESS_KEY, R2_SECRET_KEY")
         
-        # Initialize S3-compatible client for R2
-        self.s3 = boto3.client(
+        # Bounded worker pool for parallel fan-out; the connection pool is
+        # sized to match so concurrent requests never wait for a socket
+        self.max_workers = int(os.environ.get('R2_MAX_WORKERS', 16))
+        self.pool_size = int(os.environ.get('R2_POOL_SIZE', self.max_workers))
+        
+        # Slow calls fail (and are retried with client-side rate limiting) instead of hanging a worker
+        self.connect_timeout = float(os.environ.get('R2_CONNECT_TIMEOUT', 5))
+        self.read_timeout = float(os.environ.get('R2_READ_TIMEOUT', 30))
+        self.max_attempts = int(os.environ.get('R2_MAX_ATTEMPTS', 5))
+        
+        # The client is built lazily (see s3) so importing the app stays cheap
+        self._credentials = (account_id, access_key, secret_key)
+        self._injected_client = s3_client
+        self._s3 = None
+        self._s3_pid = None
+        self._s3_lock = threading.Lock()
+        # Set once the client exists, so background work never builds it ahead of warm-up or a request
+        self.client_ready = threading.Event()
+        
+        self.bucket_name = bucket_name
+        self.public_url = os.environ.get('R2_PUBLIC_URL', f'https://pub-{account_id}.r2.dev')
+        
+        # Streaming uploads: memory use is bounded by part_size * (concurrency + 1)
+        self.upload_part_size = int(os.environ.get('R2_UPLOAD_PART_SIZE', 8 * 1024 * 1024))
+        self.upload_concurrency = int(os.environ.get('R2_UPLOAD_CONCURRENCY', 4))
+        
+        # In-process cache for album metadata, track_info, manifests and listings
+        self.cache = ObjectCache(
+            max_entries=int(os.environ.get('R2_CACHE_MAX_ENTRIES', 512)),
+            ttl=float(os.environ.get('R2_CACHE_TTL', 5))
+        )
+        
+        # Thundering herds (e.g. a freshly shared album) collapse into one GET per object
+        self.single_flight = SingleFlight(
+            shared_dir=os.environ.get('SINGLE_FLIGHT_DIR', os.path.join(tempfile.gettempdir(), 'music-wheel-single-flight'))
+        )
+        
+        # Presigned playback URLs are reused until less than half their lifetime is left
+        self.signed_url_ttl = int(os.environ.get('R2_SIGNED_URL_TTL', 1800))
+        self.signed_urls = ObjectCache(max_entries=2048, ttl=self.signed_url_ttl / 2)
+        
+        # Optimistic concurrency: conditional writes retried on conflict
+        self.write_retries = int(os.environ.get('R2_WRITE_RETRIES', 5))
+        self.write_stats = {'conditional_writes': 0, 'conflicts': 0, 'retries': 0, 'exhausted': 0}
+        self._write_stats_lock = threading.Lock()
+        
+        # JSON metadata is served from a local SQLite store and synced back to R2.
+        # Created before the like aggregator so its exit-time sync runs after the last like flush
+        self.metadata_store = None
+        if local_stores and os.environ.get('METADATA_STORE', '1') != '0':
+            self.metadata_store = MetadataStore(
+                self,
+                db_path=os.environ.get('METADATA_STORE_PATH', 'metadata.db'),
+                sync_interval=float(os.environ.get('METADATA_SYNC_INTERVAL', 10))
+            )
+        
+        # Likes are aggregated locally and flushed to R2 in the background
+        self.like_aggregator = None
+        if local_stores and os.environ.get('LIKE_WRITE_BEHIND', '1') != '0':
+            self.like_aggregator = LikeAggregator(
+                self,
+                db_path=os.environ.get('LIKE_STORE_PATH', 'likes.db'),
+                flush_interval=float(os.environ.get('LIKE_FLUSH_INTERVAL', 10)),
+                flush_threshold=int(os.environ.get('LIKE_FLUSH_THRESHOLD', 100))
+            )
+        
+        print(f"✅ R2 Manager initialized. Bucket: {self.bucket_name}")
+    
+    @property
+    def s3(self):
+        """
+        Storage client (every call is timed for /metrics)
+        Created on first use in each process: a client inherited across fork()
+        would share its connection pool with the parent.
+        """
+        pid = os.getpid()
+        if self._s3 is None or self._s3_pid != pid:
+            with self._s3_lock:
+                if self._s3 is None or self._s3_pid != pid:
+                    self._s3 = InstrumentedS3Client(self._injected_client or self._create_client(), metrics)
+                    self._s3_pid = pid
+                    self.client_ready.set()
+        return self._s3
+    
+    def _create_client(self):
+        """Build the boto3 client for R2 (boto3 is imported here - it dominates startup time)"""
+        started = time.perf_counter()
+        import boto3
+        from botocore.client import Config
+        
+        account_id, access_key, secret_key = self._credentials
+        client = boto3.client(
             's3',
             endpoint_url=f'https://{account_id}.r2.cloudflarestorage.com',
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            config=Config(signature_version='s3v4'),
+            config=Config(
+                signature_version='s3v4',
+                max_pool_connections=self.pool_size,
+                connect_timeout=self.connect_timeout,
+                read_timeout=self.read_timeout,
+                retries={'total_max_attempts': self.max_attempts, 'mode': 'adaptive'},
+                tcp_keepalive=True
+            ),
             region_name='auto'
         )
         
-        self.bucket_name = bucket_name
-        self.public_url = os.environ.get('R2_PUBLIC_URL', f'https://pub-{account_id}.r2.dev')
-        
-        print(f"✅ R2 Manager initialized. Bucket: {self.bucket_name}")
+        elapsed = time.perf_counter() - started
+        metrics.startup.set('storage_client', value=elapsed)
+        print(f"⏱️  R2 client ready in {elapsed * 1000:.0f}ms (pid {os.getpid()})")
+        return client
+    
+    def warm_up(self):
+        """Build the storage client in the background so the first request doesn't pay for it"""
+        thread = threading.Thread(target=lambda: self.s3, daemon=True)
+        thread.start()
+        return thread
     
     def _get_file_path(self, album_name, track_number, file_type, style_key=None):
         """Generate consistent file paths in R2"""
@@ -55,13 +427,77 @@ class R2Manager:
             return f"{track_folder}/{style_key}_transition_lyrics.txt"
         elif file_type == 'track_info':
             return f"{track_folder}/track_info.json"
+        elif file_type == 'track_lyrics':
+            return f"{track_folder}/lyrics.json"
         elif file_type == 'album_metadata':
             return f"albums/{album_name}/album_metadata.json"
+        elif file_type == 'album_index':
+            return "album_index.json"
+        elif file_type == 'manifest':
+            return f"albums/{album_name}/manifest.json"
+        elif file_type == 'hls':
+            # Folder holding a style's HLS renditions
+            return f"{track_folder}/hls/{style_key}"
+        elif file_type == 'comments_head':
+            return f"{track_folder}/comments/head.json"
+        elif file_type == 'comments_segment':
+            # style_key carries the segment index
+            return f"{track_folder}/comments/segment_{style_key:05d}.json"
         else:
             raise Exception(f"Unknown file type: {file_type}")
     
-    def initialize_album_structure(self, album_name, track_count, styles, use_transitions=False):
-        """Create album structure in R2 with dynamic categories and transitions toggle"""
+    def key_from_url(self, url):
+        """Return the R2 object key for one of our public URLs, or None"""
+        prefix = f"{self.public_url}/"
+        if url and url.startswith(prefix):
+            return url[len(prefix):].split('?', 1)[0]
+        return None
+    
+    def get_signed_url(self, key):
+        """Short-lived presigned GET URL for an object, returns (url, seconds until it expires)"""
+        cached = self.signed_urls.get(key)
+        if cached and cached[2]:
+            url, expires_at = cached[0]
+            return url, int(expires_at - time.time())
+        
+        # Signing is local - no round-trip to R2
+        url = self.s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': key},
+            ExpiresIn=self.signed_url_ttl
+        )
+        self.signed_urls.put(key, (url, time.time() + self.signed_url_ttl))
+        return url, self.signed_url_ttl
+    
+    def get_object_etag(self, key, fetch=True):
+        """Get an object's current ETag (HEAD results are cached briefly; fetch=False: only a cached one)"""
+        cache_key = f'head:{key}'
+        cached = self.cache.get(cache_key)
+        if cached and cached[2]:
+            self.cache.record('hits')
+            return cached[1]
+        if not fetch:
+            return None
+        
+        try:
+            response = self.s3.head_object(Bucket=self.bucket_name, Key=key)
+            self.cache.record('misses')
+            self.cache.put(cache_key, response.get('ContentLength'), response.get('ETag'))
+            return response.get('ETag')
+        except Exception as e:
+            print(f"Error reading ETag for {key}: {e}")
+            return None
+    
+    def remember_object_etag(self, key, size, etag):
+        """Cache an object's size and ETag seen on another request, so get_object_etag needs no HEAD"""
+        self.cache.put(f'head:{key}', size, etag)
+    
+    def initialize_album_structure(self, album_name, track_count, styles, use_transitions=False, lazy_social_data=False):
+        """
+        Create album structure in R2 with dynamic categories and transitions toggle
+        All objects are written in parallel. With lazy_social_data, social_data.json
+        is not created here - it is written on the first like or comment.
+        """
         try:
             print("\n" + "=" * 50)
             print(f"🎵 Initializing Album: {album_name}")
@@ -92,10 +528,19 @@ class R2Manager:
                     "color": default_colors[idx % len(default_colors)]
                 })
             
-            # Save album metadata
+            # Every object is collected first and written concurrently
             metadata_path = self._get_file_path(album_name, 0, 'album_metadata')
-            self._upload_json(album_metadata, metadata_path)
-            print(f"✅ Saved album_metadata.json")
+            pending_writes = [(album_metadata, metadata_path)]
+            
+            # The manifest is built alongside the tracks - no re-read needed
+            manifest = {
+                'albumName': album_name,
+                'artist': 'Various Artists',
+                'styles': album_metadata['styles'],
+                'useTransitions': use_transitions,
+                'tracks': {},
+                'transitions': {}
+            }
             
             # Create track info for each track
             for i in range(1, track_count + 1):
@@ -138,228 +583,1002 @@ class R2Manager:
                 track_path = self._get_file_path(album_name, i, 'track_info')
                 social_path = self._get_file_path(album_name, i, 'social_data')
                 
-                self._upload_json(track_info, track_path)
-                self._upload_json(social_data, social_path)
-                print(f"📁 Created Track_{i:02d}")
+                pending_writes.append((track_info, track_path))
+                if not lazy_social_data:
+                    pending_writes.append((social_data, social_path))
+                manifest['tracks'][str(i)] = self._build_track_data(track_info, social_data, use_transitions)
             
+            failures = self._upload_json_many(pending_writes)
+            
+            if failures:
+                details = ', '.join(f"{path} ({error})" for path, error in sorted(failures.items()))
+                raise Exception(f"{len(failures)} of {len(pending_writes)} objects failed to write: {details}")
+            
+            print(f"✅ Saved album_metadata.json and {track_count} tracks ({len(pending_writes)} objects)")
+            
+            # The manifest goes last so a half-written album is never served
+            self._upload_json(manifest, self._get_file_path(album_name, 0, 'manifest'))
+            print("✅ Saved manifest.json")
+            
+            self._update_album_index(album_name, {
+                'name': album_name,
+                'track_count': track_count,
+                'style_count': len(styles),
+                'last_modified': datetime.now(timezone.utc).isoformat()
+            })
             print(f"\n✅ Album '{album_name}' initialized successfully!\n")
             return album_name
             
         except Exception as e:
             raise Exception(f"Error creating album: {e}")
     
-    def _upload_json(self, data, file_path):
-        """Upload JSON data to R2"""
-        json_content = json.dumps(data, indent=2, ensure_ascii=False)
-        self.s3.put_object(
+    # Objects that are read far more often than written
+    CACHEABLE_SUFFIXES = (
+        'manifest.json', 'album_metadata.json', 'track_info.json', 'album_index.json', 'comments/head.json', 'lyrics.json'
+    )
+    
+    def _is_cacheable(self, file_path):
+        return file_path.endswith(self.CACHEABLE_SUFFIXES)
+    
+    def _in_store(self, file_path):
+        return (
+            self.metadata_store is not None
+            and self.metadata_store.handles(file_path)
+            and self.metadata_store.active()
+        )
+    
+    def _upload_json(self, data, file_path, if_match=None, if_none_match=None):
+        """Upload JSON data (optionally conditional on the current ETag)"""
+        json_content = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        
+        if self._in_store(file_path):
+            if if_match or if_none_match:
+                # Conditions are checked locally - make sure the current version is loaded
+                self._read_document(file_path)
+            return self.metadata_store.put(file_path, json_content, if_match=if_match, if_none_match=if_none_match)
+        
+        return self._put_json_content(file_path, json_content, if_match=if_match, if_none_match=if_none_match)
+    
+    def _put_json_content(self, file_path, json_content, if_match=None, if_none_match=None):
+        """PUT JSON text to R2 itself (the metadata store syncs through here)"""
+        conditions = {}
+        if if_match:
+            conditions['IfMatch'] = if_match
+        if if_none_match:
+            conditions['IfNoneMatch'] = if_none_match
+        
+        response = self.s3.put_object(
             Bucket=self.bucket_name,
             Key=file_path,
             Body=json_content.encode('utf-8'),
-            ContentType='application/json'
+            ContentType='application/json',
+            **conditions
         )
+        
+        # Write-through so our own writes are visible immediately
+        if self._is_cacheable(file_path):
+            self.cache.put(file_path, json_content, response.get('ETag'))
+        
+        return response.get('ETag')
     
     def _download_json(self, file_path):
         """Download and parse JSON from R2"""
+        return self._download_json_with_etag(file_path)[0]
+    
+    def _download_json_with_etag(self, file_path, use_cache=True):
+        """Download and parse JSON (metadata store or R2), returns (data, etag) or (None, None)"""
         try:
-            response = self.s3.get_object(Bucket=self.bucket_name, Key=file_path)
-            content = response['Body'].read().decode('utf-8')
-            return json.loads(content)
+            if self._in_store(file_path):
+                content, etag = self._read_document(file_path)
+                return (json.loads(content), etag) if content is not None else (None, None)
+            
+            cacheable = self._is_cacheable(file_path)
+            
+            if not use_cache or not cacheable:
+                # Writers always read the object themselves, and per-track social data is rarely read in bursts
+                response = self.s3.get_object(Bucket=self.bucket_name, Key=file_path)
+                content, etag = response['Body'].read().decode('utf-8'), response.get('ETag')
+            else:
+                cached = self.cache.get(file_path)
+                if cached and cached[2]:
+                    self.cache.record('hits')
+                    return json.loads(cached[0]), cached[1]
+                
+                # Concurrent reads of the same object (from any worker) share one GET
+                content, etag = self.single_flight.do(file_path, lambda: self._fetch_json_content(file_path, cached))
+            
+            if cacheable:
+                self.cache.put(file_path, content, etag)
+            return json.loads(content), etag
+        except ClientError as e:
+            # Missing objects are expected (e.g. social_data.json created lazily)
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                print(f"Error downloading {file_path}: {e}")
+            return None, None
         except Exception as e:
             print(f"Error downloading {file_path}: {e}")
-            return None
+            return None, None
     
-    def update_track_metadata(self, album_name, track_number, track_name, artist_name):
-        """Update track metadata"""
+    def _fetch_json_content(self, file_path, cached=None):
+        """GET a JSON object's text, revalidating a stale cache entry - returns (content, etag)"""
+        if cached:
+            content, etag, _ = cached
+            try:
+                response = self.s3.get_object(Bucket=self.bucket_name, Key=file_path, IfNoneMatch=etag)
+            except ClientError as e:
+                if e.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 304:
+                    self.cache.record('revalidated')
+                    return content, etag
+                if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                    self.cache.invalidate(file_path)
+                raise
+        else:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=file_path)
+        
+        self.cache.record('misses')
+        return response['Body'].read().decode('utf-8'), response.get('ETag')
+    
+    def _read_document(self, file_path):
+        """(text, etag) of a JSON document from the metadata store - (None, None) if it doesn't exist"""
+        document = self.metadata_store.get(file_path)
+        if document is None:
+            # First read on this host - load it from R2 (concurrent first reads share one GET)
+            fetched = self.single_flight.do(file_path, lambda: self._fetch_document(file_path))
+            document = self.metadata_store.load(file_path, *(fetched or (None, None)))
+        return document
+    
+    def _fetch_document(self, file_path):
+        """(text, etag) of a JSON object in R2, or None if it doesn't exist"""
         try:
-            track_path = self._get_file_path(album_name, track_number, 'track_info')
-            track_info = self._download_json(track_path)
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=file_path)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return response['Body'].read().decode('utf-8'), response.get('ETag')
+    
+    def _merge_document(self, file_path, base, local, remote):
+        """Three-way merge of a JSON document's text (the metadata store's write-back conflicts)"""
+        base = json.loads(base) if base is not None else None
+        local, remote = json.loads(local), json.loads(remote)
+        merged = merge_json(base, local, remote)
+        # Like counts follow the merged set of likes (merge_json keeps R2's count)
+        if file_path.endswith('social_data.json') and isinstance(merged.get('likes'), list):
+            merged['like_count'] = len(merged['likes'])
+        return json.dumps(merged, separators=(',', ':'), ensure_ascii=False)
+    
+    def _current_etag(self, file_path):
+        """ETag of a cacheable JSON object, answered from the cache while fresh"""
+        if self._in_store(file_path):
+            try:
+                return self._read_document(file_path)[1]
+            except Exception as e:
+                print(f"Error downloading {file_path}: {e}")
+                return None
+        
+        cached = self.cache.get(file_path)
+        if cached and cached[2]:
+            return cached[1]
+        return self._download_json_with_etag(file_path)[1]
+    
+    def _is_precondition_failure(self, error):
+        """True if a conditional write lost a race with another writer"""
+        if not isinstance(error, ClientError):
+            return False
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return code in ('PreconditionFailed', 'ConditionalRequestConflict') or status in (409, 412)
+    
+    def is_transient_error(self, error):
+        """True if an operation failed on a network or R2 error that may pass (background jobs retry these)"""
+        while error is not None:
+            if isinstance(error, (BotoConnectionError, HTTPClientError, ConnectionError, TimeoutError)):
+                return True
+            if isinstance(error, ClientError):
+                code = error.response.get('Error', {}).get('Code')
+                status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+                # Writes that kept losing races may well win once the other writers are done
+                return (code in self.TRANSIENT_ERROR_CODES or status == 429 or status >= 500
+                        or self._is_precondition_failure(error))
+            # Plain Exceptions here mostly wrap the storage error that caused them
+            if type(error) is not Exception:
+                return False
+            error = error.__cause__ or error.__context__
+        return False
+    
+    def _mutate_json(self, file_path, mutate, default=None, assume_missing=False):
+        """
+        Optimistic read-modify-write of a JSON object
+        mutate(data) edits data in place and may return a result. The write is
+        conditional on the ETag we read (or on the object not existing yet),
+        and is retried with jittered backoff when another writer got there
+        first. If the object is missing and no default factory is given,
+        nothing is written. Returns (data, result).
+        """
+        for attempt in range(self.write_retries + 1):
+            if assume_missing and attempt == 0:
+                data, etag = None, None
+            else:
+                # Retries always re-read from R2 rather than the cache
+                data, etag = self._download_json_with_etag(file_path, use_cache=(attempt == 0))
             
-            if not track_info:
-                raise Exception("track_info.json not found")
+            if data is None:
+                if default is None:
+                    return None, None
+                data = default()
             
-            track_info['track_name'] = track_name
-            track_info['artist_name'] = artist_name
+            result = mutate(data)
             
-            self._upload_json(track_info, track_path)
+            try:
+                self._record_write('conditional_writes')
+                if etag:
+                    self._upload_json(data, file_path, if_match=etag)
+                else:
+                    self._upload_json(data, file_path, if_none_match='*')
+                return data, result
+            except ClientError as e:
+                if not self._is_precondition_failure(e):
+                    raise
+                self._record_write('conflicts')
+                self.cache.invalidate(file_path)
+            
+            if attempt < self.write_retries:
+                self._record_write('retries')
+                time.sleep(min(1.0, 0.05 * (2 ** attempt)) * random.uniform(0.5, 1.5))
+        
+        self._record_write('exhausted')
+        raise Exception(f"Too much write contention on {file_path}")
+    
+    def _record_write(self, stat):
+        with self._write_stats_lock:
+            self.write_stats[stat] += 1
+    
+    def get_write_stats(self):
+        with self._write_stats_lock:
+            return dict(self.write_stats)
+    
+    def _upload_json_many(self, items):
+        """Upload several JSON objects in parallel, returns {path: error} for failures"""
+        if items and self._in_store(items[0][1]) and all(self.metadata_store.handles(path) for _, path in items):
+            # One local transaction instead of a PUT per document
+            try:
+                self.metadata_store.put_many([
+                    (file_path, json.dumps(data, separators=(',', ':'), ensure_ascii=False)) for data, file_path in items
+                ])
+                return {}
+            except Exception as e:
+                return {file_path: e for _, file_path in items}
+        
+        if not items:
+            return {}
+        
+        def upload(item):
+            data, file_path = item
+            try:
+                self._upload_json(data, file_path)
+                return file_path, None
+            except Exception as e:
+                return file_path, e
+        
+        workers = min(self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return {path: error for path, error in executor.map(metrics.bind_request(upload), items) if error}
+    
+    def _download_json_many(self, file_paths):
+        """Download several JSON objects in parallel, returns {path: data}"""
+        if not file_paths:
+            return {}
+        
+        results = {}
+        if self.metadata_store and self.metadata_store.active():
+            # Documents already on this host come from one indexed query; only the rest go to R2
+            stored = self.metadata_store.get_many(path for path in file_paths if self.metadata_store.handles(path))
+            results = {path: json.loads(content) if content is not None else None for path, (content, _) in stored.items()}
+            file_paths = [path for path in file_paths if path not in results]
+            if not file_paths:
+                return results
+        
+        workers = min(self.max_workers, len(file_paths))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results.update(zip(file_paths, executor.map(metrics.bind_request(self._download_json), file_paths)))
+            return results
+    
+    def batch_track_update(self, album_name, track_number):
+        """Start a batch of track_info.json changes committed with one read and one write"""
+        return TrackInfoBatch(self, album_name, track_number)
+    
+    def update_track_metadata(self, album_name, track_number, track_name, artist_name):
+        """Update track metadata"""
+        try:
+            batch = self.batch_track_update(album_name, track_number)
+            batch.set_metadata(track_name, artist_name)
+            batch.commit()
             print(f"  ✅ Metadata updated for Track {track_number}")
             
         except Exception as e:
             raise Exception(f"Error updating metadata: {e}")
     
+    def _get_content_type(self, file_type):
+        """Content type for a track file type"""
+        if file_type == 'icon':
+            return 'image/png'
+        elif file_type in ['audio', 'transition_audio']:
+            return 'audio/mpeg'
+        elif file_type in ['lyrics', 'transition_lyrics']:
+            return 'text/plain'
+        else:
+            return 'application/octet-stream'
+    
+    def _apply_track_file(self, track_info, file_type, style_key, file_url):
+        """Point the right track_info field at an uploaded file"""
+        if file_type == 'icon':
+            track_info['icon_url'] = file_url
+            return
+        
+        if style_key not in track_info['styles']:
+            track_info['styles'][style_key] = {}
+        style_data = track_info['styles'][style_key]
+        
+        if file_type == 'audio':
+            style_data['audio_url'] = file_url
+            style_data['audio_type'] = 'file'
+            style_data['uploaded'] = True
+            # Renditions of the previous file are stale until re-transcoded, which deletes them
+            stale_url = style_data.pop('hls_url', None)
+            if stale_url:
+                style_data['stale_hls_url'] = stale_url
+        elif file_type == 'transition_audio':
+            style_data['transition_audio_url'] = file_url
+            style_data['transition_audio_type'] = 'file'
+        elif file_type in self.LYRICS_TYPES:
+            style_data[f'{file_type}_url'] = file_url
+            # The text itself lives in lyrics.json
+            style_data.pop(file_type, None)
+    
+    def _store_track_lyrics(self, album_name, track_number, changes):
+        """Apply [(file_type, style_key, text)] to a track's lyrics.json (text None: read the file instead)"""
+        lyrics_path = self._get_file_path(album_name, track_number, 'track_lyrics')
+        
+        def apply(lyrics):
+            for file_type, style_key, text in changes:
+                group = lyrics.setdefault('styles' if file_type == 'lyrics' else 'transitions', {})
+                if text is None:
+                    group.pop(style_key, None)
+                else:
+                    group[style_key] = text
+        
+        self._mutate_json(lyrics_path, apply, default=lambda: {'styles': {}, 'transitions': {}})
+    
+    def _apply_youtube_link(self, track_info, file_type, style_key, video_id):
+        """Store a YouTube video ID in track_info"""
+        if style_key not in track_info['styles']:
+            track_info['styles'][style_key] = {}
+        
+        if file_type == 'audio':
+            # Don't store URL - just the ID and type
+            track_info['styles'][style_key]['audio_type'] = 'youtube'
+            track_info['styles'][style_key]['youtube_id'] = video_id
+            track_info['styles'][style_key]['uploaded'] = True
+        elif file_type == 'transition_audio':
+            track_info['styles'][style_key]['transition_audio_type'] = 'youtube'
+            track_info['styles'][style_key]['transition_youtube_id'] = video_id
+    
+    def record_track_file(self, album_name, track_number, file_type, style_key, text=None):
+        """Point track_info.json at an uploaded file and return its public URL"""
+        batch = self.batch_track_update(album_name, track_number)
+        file_url = batch.set_file(file_type, style_key, text)
+        batch.commit()
+        return file_url
+    
     def upload_track_file(self, album_name, track_number, file_type, style_key, file_path):
         """Upload a file to R2"""
         try:
             # Generate R2 path
             r2_path = self._get_file_path(album_name, track_number, file_type, style_key)
             
-            # Determine content type
-            if file_type == 'icon':
-                content_type = 'image/png'
-            elif file_type in ['audio', 'transition_audio']:
-                content_type = 'audio/mpeg'
-            elif file_type in ['lyrics', 'transition_lyrics']:
-                content_type = 'text/plain'
-            else:
-                content_type = 'application/octet-stream'
-            
             # Upload file
             with open(file_path, 'rb') as f:
                 self.s3.put_object(
                     Bucket=self.bucket_name,
                     Key=r2_path,
                     Body=f,
-                    ContentType=content_type
+                    ContentType=self._get_content_type(file_type)
                 )
             
-            # Generate public URL
-            file_url = f"{self.public_url}/{r2_path}"
-            
-            # Update track_info.json
-            track_info_path = self._get_file_path(album_name, track_number, 'track_info')
-            track_info = self._download_json(track_info_path)
-            
-            if track_info:
-                # Update the correct field
-                if file_type == 'icon':
-                    track_info['icon_url'] = file_url
-                elif file_type == 'audio':
-                    if style_key not in track_info['styles']:
-                        track_info['styles'][style_key] = {}
-                    track_info['styles'][style_key]['audio_url'] = file_url
-                    track_info['styles'][style_key]['audio_type'] = 'file'
-                    track_info['styles'][style_key]['uploaded'] = True
-                elif file_type == 'lyrics':
-                    if style_key not in track_info['styles']:
-                        track_info['styles'][style_key] = {}
-                    track_info['styles'][style_key]['lyrics_url'] = file_url
-                elif file_type == 'transition_audio':
-                    if style_key not in track_info['styles']:
-                        track_info['styles'][style_key] = {}
-                    track_info['styles'][style_key]['transition_audio_url'] = file_url
-                    track_info['styles'][style_key]['transition_audio_type'] = 'file'
-                elif file_type == 'transition_lyrics':
-                    if style_key not in track_info['styles']:
-                        track_info['styles'][style_key] = {}
-                    track_info['styles'][style_key]['transition_lyrics_url'] = file_url
-                
-                self._upload_json(track_info, track_info_path)
+            # Lyrics are captured now so players never have to fetch the file
+            text = None
+            if file_type in self.LYRICS_TYPES and os.path.getsize(file_path) <= self.LYRICS_INLINE_MAX_BYTES:
+                with open(file_path, 'rb') as f:
+                    text = f.read().decode('utf-8', 'replace')
             
+            file_url = self.record_track_file(album_name, track_number, file_type, style_key, text)
             print(f"  ✅ Uploaded: {r2_path}")
             return file_url
             
         except Exception as e:
             raise Exception(f"Error uploading file: {e}")
     
-    def load_album_data(self, album_name):
-        """Load complete album data"""
+    def open_track_file_stream(self, album_name, track_number, file_type, style_key):
+        """Open a writable stream that uploads a track file straight to R2"""
+        r2_path = self._get_file_path(album_name, track_number, file_type, style_key)
+        return MultipartUploadWriter(
+            self, r2_path, self._get_content_type(file_type),
+            part_size=self.upload_part_size,
+            max_in_flight=self.upload_concurrency,
+            capture_limit=self.LYRICS_INLINE_MAX_BYTES if file_type in self.LYRICS_TYPES else 0
+        )
+    
+    def presign_track_file_upload(self, album_name, track_number, file_type, style_key, size, expires_in=3600):
+        """
+        Presigned URLs for uploading a track file straight from the browser to R2
+        Files up to one part are a single PUT ({'method': 'put', 'url'}); larger
+        files start a multipart upload ({'method': 'multipart', 'upload_id',
+        'part_size', 'parts': [{'part_number', 'url'}]}).
+        """
+        r2_path = self._get_file_path(album_name, track_number, file_type, style_key)
+        content_type = self._get_content_type(file_type)
+        
+        part_size = max(self.upload_part_size, MultipartUploadWriter.MIN_PART_SIZE)
+        if size <= part_size:
+            url = self.s3.generate_presigned_url(
+                'put_object',
+                Params={'Bucket': self.bucket_name, 'Key': r2_path, 'ContentType': content_type},
+                ExpiresIn=expires_in
+            )
+            return {'method': 'put', 'url': url, 'content_type': content_type}
+        
+        # S3/R2 allow at most 10,000 parts
+        part_size = max(part_size, -(-size // 10000))
+        part_count = -(-size // part_size)
+        
+        response = self.s3.create_multipart_upload(Bucket=self.bucket_name, Key=r2_path, ContentType=content_type)
+        upload_id = response['UploadId']
+        parts = [
+            {
+                'part_number': part_number,
+                'url': self.s3.generate_presigned_url(
+                    'upload_part',
+                    Params={
+                        'Bucket': self.bucket_name,
+                        'Key': r2_path,
+                        'UploadId': upload_id,
+                        'PartNumber': part_number
+                    },
+                    ExpiresIn=expires_in
+                )
+            }
+            for part_number in range(1, part_count + 1)
+        ]
+        return {'method': 'multipart', 'upload_id': upload_id, 'part_size': part_size, 'parts': parts}
+    
+    def complete_track_file_upload(self, album_name, track_number, file_type, style_key, size, upload_id=None, parts=None):
+        """
+        Finish a direct upload and verify the object landed with the expected size
+        parts is [{'part_number', 'etag'}] for multipart uploads. Raises if the
+        object is missing or its size does not match; track_info is not touched.
+        """
+        r2_path = self._get_file_path(album_name, track_number, file_type, style_key)
+        
+        if upload_id:
+            try:
+                self.s3.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=r2_path,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': [
+                        {'PartNumber': int(part['part_number']), 'ETag': part['etag']}
+                        for part in sorted(parts or [], key=lambda part: int(part['part_number']))
+                    ]}
+                )
+            except ClientError as e:
+                # Already completed by an earlier attempt - the size check below decides
+                if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+                    raise
+        
         try:
-            # Load album metadata
-            metadata_path = self._get_file_path(album_name, 0, 'album_metadata')
-            album_metadata = self._download_json(metadata_path)
+            response = self.s3.head_object(Bucket=self.bucket_name, Key=r2_path)
+        except ClientError as e:
+            raise Exception(f"Uploaded file not found: {r2_path}") from e
+        
+        if response['ContentLength'] != size:
+            raise Exception(f"Size mismatch for {r2_path}: expected {size}, got {response['ContentLength']}")
+        
+        # The audio proxy looks objects up by ETag - remember the new version
+        self.remember_object_etag(r2_path, response['ContentLength'], response.get('ETag'))
+        return r2_path
+    
+    def read_track_lyrics(self, album_name, track_number, file_type, style_key):
+        """Download a lyrics file as text, or None if it is missing or too large to keep in lyrics.json"""
+        r2_path = self._get_file_path(album_name, track_number, file_type, style_key)
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=r2_path)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                print(f"Error downloading {r2_path}: {e}")
+            return None
+        
+        if response['ContentLength'] > self.LYRICS_INLINE_MAX_BYTES:
+            response['Body'].close()
+            return None
+        return response['Body'].read().decode('utf-8', 'replace')
+    
+    def abort_track_file_upload(self, album_name, track_number, file_type, style_key, upload_id):
+        """Abandon a direct multipart upload and release its parts"""
+        r2_path = self._get_file_path(album_name, track_number, file_type, style_key)
+        self.s3.abort_multipart_upload(Bucket=self.bucket_name, Key=r2_path, UploadId=upload_id)
+    
+    def configure_upload_cors(self, origins):
+        """Allow browsers on the given origins to PUT directly to the bucket and read part ETags"""
+        self.s3.put_bucket_cors(
+            Bucket=self.bucket_name,
+            CORSConfiguration={'CORSRules': [{
+                'AllowedOrigins': origins,
+                'AllowedMethods': ['GET', 'PUT'],
+                'AllowedHeaders': ['*'],
+                'ExposeHeaders': ['ETag'],
+                'MaxAgeSeconds': 3600
+            }]}
+        )
+        print(f"✅ Upload CORS configured for: {', '.join(origins)}")
+    
+    def build_hls_renditions(self, album_name, track_number, style_key, transcoder, progress=None):
+        """
+        Transcode a style's uploaded MP3 into HLS renditions and record the master playlist
+        Renditions live in a folder named after the source ETag, so players never
+        mix segments of two uploads. The playlist is only recorded if the MP3 is
+        still the one that was transcoded; the version it replaces is deleted.
+        Returns the playlist URL, or None if a newer upload superseded this one
+        (safe to re-run).
+        """
+        source_key = self._get_file_path(album_name, track_number, 'audio', style_key)
+        source_etag = self.s3.head_object(Bucket=self.bucket_name, Key=source_key)['ETag']
+        hls_folder = self._get_file_path(album_name, track_number, 'hls', style_key)
+        version = source_etag.strip('"')[:16]
+        version_folder = f"{hls_folder}/{version}"
+        
+        work_dir = tempfile.mkdtemp(prefix='hls_')
+        try:
+            # Stream the source to disk - ffmpeg needs a seekable file
+            source_path = os.path.join(work_dir, 'source.mp3')
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=source_key, IfMatch=source_etag)
+            with open(source_path, 'wb') as f:
+                for chunk in response['Body'].iter_chunks(chunk_size=256 * 1024):
+                    f.write(chunk)
             
-            if not album_metadata:
-                return None
+            if progress:
+                progress(1, 3, 'Transcoding')
+            output_dir = os.path.join(work_dir, 'hls')
+            os.makedirs(output_dir)
+            files = transcoder.transcode(source_path, output_dir)
             
-            album_styles = album_metadata.get('styles', [])
-            track_count = album_metadata.get('track_count', 8)
-            use_transitions = album_metadata.get('use_transitions', False)
+            if progress:
+                progress(2, 3, f'Uploading {len(files)} files')
             
-            print(f"✅ Loaded album: {album_name}")
-            print(f"📊 Styles: {len(album_styles)}")
-            print(f"🔄 Transitions: {'Yes' if use_transitions else 'No'}")
+            def upload(relative_path):
+                with open(os.path.join(output_dir, relative_path), 'rb') as f:
+                    self.s3.put_object(
+                        Bucket=self.bucket_name,
+                        Key=f"{version_folder}/{relative_path.replace(os.sep, '/')}",
+                        Body=f.read(),
+                        ContentType=transcoder.content_type(relative_path)
+                    )
             
-            album_data = {
-                'albumName': album_name,
-                'artist': 'Various Artists',
-                'styles': album_styles,
-                'useTransitions': use_transitions,
-                'tracks': {},
-                'transitions': {}
+            # Playlists go up only after everything they reference
+            segments = [path for path in files if not path.endswith('.m3u8')]
+            playlists = [path for path in files if path.endswith('.m3u8') and path != 'master.m3u8']
+            for group in (segments, playlists, ['master.m3u8']):
+                if group:
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(group))) as executor:
+                        list(executor.map(metrics.bind_request(upload), group))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        playlist_url = f"{self.public_url}/{version_folder}/master.m3u8"
+        track_path = self._get_file_path(album_name, track_number, 'track_info')
+        
+        def publish(track_info):
+            # Another job may have transcoded a newer upload while this one was running
+            if self.s3.head_object(Bucket=self.bucket_name, Key=source_key)['ETag'] != source_etag:
+                return False, None
+            style = track_info['styles'].setdefault(style_key, {})
+            # A new upload moved the renditions it made stale out of hls_url
+            previous_url = style.pop('stale_hls_url', None) or style.get('hls_url')
+            style['hls_url'] = playlist_url
+            return True, previous_url
+        
+        track_info, outcome = self._mutate_json(track_path, publish)
+        if not track_info:
+            raise Exception("track_info.json not found")
+        published, previous_url = outcome
+        
+        if published:
+            self._patch_manifest_track(album_name, track_info)
+            # Drop only the version this one replaced, never a newer one still being built
+            stale_key = self.key_from_url(previous_url) or ''
+            stale_folder = stale_key.rsplit('/', 1)[0] if stale_key.startswith(f"{hls_folder}/") else None
+            if stale_folder == version_folder:
+                stale_folder = None
+        else:
+            # Superseded - nothing references what this job uploaded
+            stale_folder = version_folder
+        
+        if stale_folder:
+            paginator = self.s3.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=f"{stale_folder}/"):
+                stale = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+                if stale:
+                    self.s3.delete_objects(Bucket=self.bucket_name, Delete={'Objects': stale})
+        
+        if not published:
+            print(f"  ⏭️  HLS renditions superseded by a newer upload: {album_name} Track {track_number} ({style_key})")
+            return None
+        
+        print(f"  ✅ HLS renditions ready: {album_name} Track {track_number} ({style_key})")
+        return playlist_url
+    
+    def _build_track_data(self, track_info, social_data, use_transitions, comments_head=None):
+        """Shape a track_info/social_data pair into the player's track entry"""
+        track_num = track_info['track_number']
+        
+        # Comments live in segments; older tracks may still only have the legacy array
+        if comments_head:
+            comment_count = comments_head.get('count', 0)
+        else:
+            comment_count = len(social_data.get('comments', [])) if social_data else 0
+        
+        track_data = {
+            'number': track_num,
+            'name': track_info.get('track_name', f'Track {track_num}'),
+            'artist': track_info.get('artist_name', 'Unknown Artist'),
+            'icon': track_info.get('icon_url'),
+            'styles': {},
+            'social': {
+                'likes': social_data.get('like_count', 0) if social_data else 0,
+                'comments': comment_count
             }
+        }
+        
+        for style_key, style_data in track_info.get('styles', {}).items():
+            # Check if this style has audio (either file or YouTube)
+            has_file_audio = style_data.get('audio_url')
+            has_youtube = style_data.get('audio_type') == 'youtube' and style_data.get('youtube_id')
             
-            # Load all tracks
-            for i in range(1, track_count + 1):
-                track_path = self._get_file_path(album_name, i, 'track_info')
-                track_info = self._download_json(track_path)
+            if has_file_audio or has_youtube:
+                style_track = {
+                    'audio_type': style_data.get('audio_type', 'file'),
+                    'lyrics_url': style_data.get('lyrics_url'),
+                    'uploaded': True
+                }
                 
-                # Load social data
-                social_path = self._get_file_path(album_name, i, 'social_data')
-                social_data = self._download_json(social_path)
+                # Add URL only for file-based audio
+                if has_file_audio:
+                    style_track['url'] = style_data.get('audio_url')
+                    if style_data.get('hls_url'):
+                        style_track['hls_url'] = style_data['hls_url']
                 
-                if track_info:
-                    track_num = track_info['track_number']
-                    
-                    track_data = {
-                        'number': track_num,
-                        'name': track_info.get('track_name', f'Track {track_num}'),
-                        'artist': track_info.get('artist_name', 'Unknown Artist'),
-                        'icon': track_info.get('icon_url'),
-                        'styles': {},
-                        'social': {
-                            'likes': social_data.get('like_count', 0) if social_data else 0,
-                            'comments': len(social_data.get('comments', [])) if social_data else 0
-                        }
-                    }
-                    
-                    for style_key, style_data in track_info.get('styles', {}).items():
-                        # Check if this style has audio (either file or YouTube)
-                        has_file_audio = style_data.get('audio_url')
-                        has_youtube = style_data.get('audio_type') == 'youtube' and style_data.get('youtube_id')
-                        
-                        if has_file_audio or has_youtube:
-                            style_track = {
-                                'audio_type': style_data.get('audio_type', 'file'),
-                                'lyrics_url': style_data.get('lyrics_url'),
-                                'uploaded': True
-                            }
-                            
-                            # Add URL only for file-based audio
-                            if has_file_audio:
-                                style_track['url'] = style_data.get('audio_url')
-                            
-                            # Add YouTube ID only for YouTube audio
-                            if has_youtube:
-                                style_track['youtube_id'] = style_data.get('youtube_id')
-                            
-                            track_data['styles'][style_key] = style_track
-                            
-                            if use_transitions:
-                                has_transition_file = style_data.get('transition_audio_url')
-                                has_transition_youtube = style_data.get('transition_audio_type') == 'youtube' and style_data.get('transition_youtube_id')
-                                
-                                track_data['styles'][style_key]['transition_url'] = style_data.get('transition_audio_url') if has_transition_file else None
-                                track_data['styles'][style_key]['transition_audio_type'] = style_data.get('transition_audio_type', 'file')
-                                track_data['styles'][style_key]['transition_youtube_id'] = style_data.get('transition_youtube_id', '')
-                                track_data['styles'][style_key]['transition_lyrics_url'] = style_data.get('transition_lyrics_url', '')
+                # Add YouTube ID only for YouTube audio
+                if has_youtube:
+                    style_track['youtube_id'] = style_data.get('youtube_id')
+                
+                track_data['styles'][style_key] = style_track
+                
+                if use_transitions:
+                    has_transition_file = style_data.get('transition_audio_url')
                     
-                    album_data['tracks'][str(track_num)] = track_data
-                    print(f"  ✅ Track {i}")
+                    track_data['styles'][style_key]['transition_url'] = style_data.get('transition_audio_url') if has_transition_file else None
+                    track_data['styles'][style_key]['transition_audio_type'] = style_data.get('transition_audio_type', 'file')
+                    track_data['styles'][style_key]['transition_youtube_id'] = style_data.get('transition_youtube_id', '')
+                    track_data['styles'][style_key]['transition_lyrics_url'] = style_data.get('transition_lyrics_url', '')
+        
+        return track_data
+    
+    def _build_album_data(self, album_name, album_metadata):
+        """Build the player's album_data from album metadata and every track's objects"""
+        album_styles = album_metadata.get('styles', [])
+        track_count = album_metadata.get('track_count', 8)
+        use_transitions = album_metadata.get('use_transitions', False)
+        
+        album_data = {
+            'albumName': album_name,
+            'artist': 'Various Artists',
+            'styles': album_styles,
+            'useTransitions': use_transitions,
+            'tracks': {},
+            'transitions': {}
+        }
+        
+        # Fetch all track_info, social_data and comment heads in parallel
+        track_paths = {}
+        for i in range(1, track_count + 1):
+            track_paths[i] = (
+                self._get_file_path(album_name, i, 'track_info'),
+                self._get_file_path(album_name, i, 'social_data'),
+                self._get_file_path(album_name, i, 'comments_head')
+            )
+        
+        all_paths = [path for paths in track_paths.values() for path in paths]
+        downloaded = self._download_json_many(all_paths)
+        
+        for i in range(1, track_count + 1):
+            track_path, social_path, head_path = track_paths[i]
+            track_info = downloaded.get(track_path)
+            social_data = downloaded.get(social_path)
+            
+            if track_info:
+                track_data = self._build_track_data(
+                    track_info, social_data, use_transitions, downloaded.get(head_path)
+                )
+                album_data['tracks'][str(track_data['number'])] = track_data
+        
+        return album_data
+    
+    def rebuild_manifest(self, album_name):
+        """Rebuild manifest.json from album_metadata, track_info and social_data"""
+        metadata_path = self._get_file_path(album_name, 0, 'album_metadata')
+        album_metadata = self._download_json(metadata_path)
+        
+        if not album_metadata:
+            return None
+        
+        album_data = self._build_album_data(album_name, album_metadata)
+        self._upload_json(album_data, self._get_file_path(album_name, 0, 'manifest'))
+        print(f"✅ Manifest rebuilt for album: {album_name}")
+        return album_data
+    
+    def _patch_manifest_track(self, album_name, track_info=None, track_number=None, social_counts=None):
+        """
+        Patch a single track entry in manifest.json after a write
+        social_counts is a partial {'likes': n, 'comments': n} update.
+        """
+        try:
+            manifest_path = self._get_file_path(album_name, 0, 'manifest')
+            key = str(track_info['track_number'] if track_info else track_number)
+            
+            def patch(manifest):
+                existing = manifest['tracks'].get(key)
+                
+                if track_info:
+                    track_data = self._build_track_data(track_info, None, manifest.get('useTransitions', False))
+                    # Social counts are maintained separately by the social writes
+                    if existing:
+                        track_data['social'] = existing.get('social', track_data['social'])
+                    manifest['tracks'][key] = track_data
+                
+                if social_counts and key in manifest['tracks']:
+                    manifest['tracks'][key].setdefault('social', {}).update(social_counts)
+            
+            manifest, _ = self._mutate_json(manifest_path, patch)
+            
+            if not manifest:
+                # No manifest yet (album created before manifests existed)
+                self.rebuild_manifest(album_name)
+            
+        except Exception as e:
+            # The manifest is derived data - never fail the write because of it
+            print(f"⚠️  Error patching manifest for {album_name}: {e}")
+    
+    def load_album_data(self, album_name, include_lyrics=False):
+        """Load complete album data (with each track's lyrics.json text if include_lyrics)"""
+        try:
+            # Fast path: the precomputed manifest is a single GET
+            manifest = self._download_json(self._get_file_path(album_name, 0, 'manifest'))
+            
+            if manifest:
+                print(f"✅ Loaded album from manifest: {album_name}")
+                self._apply_live_like_counts(album_name, manifest)
+                if include_lyrics:
+                    self._attach_lyrics(album_name, manifest)
+                return manifest
+            
+            # Albums created before manifests existed - build it once
+            album_data = self.rebuild_manifest(album_name)
+            
+            if not album_data:
+                return None
+            
+            self._apply_live_like_counts(album_name, album_data)
+            if include_lyrics:
+                self._attach_lyrics(album_name, album_data)
+            print(f"✅ Loaded album: {album_name}")
+            print(f"📊 Styles: {len(album_data['styles'])}")
+            print(f"🔄 Transitions: {'Yes' if album_data['useTransitions'] else 'No'}")
             
             return album_data
             
         except Exception as e:
             print(f"Error loading album: {e}")
-            import traceback
             traceback.print_exc()
             return None
     
+    def _attach_lyrics(self, album_name, album_data):
+        """Copy every track's lyrics.json text into a loaded album (the response only, never the manifest)"""
+        lyrics_paths = {
+            track_key: self._get_file_path(album_name, int(track_key), 'track_lyrics')
+            for track_key in album_data['tracks']
+        }
+        stored = self._download_json_many(list(lyrics_paths.values()))
+        
+        for track_key, track in album_data['tracks'].items():
+            lyrics = stored.get(lyrics_paths[track_key]) or {}
+            for style_key, style in track['styles'].items():
+                for file_type, group in (('lyrics', 'styles'), ('transition_lyrics', 'transitions')):
+                    text = lyrics.get(group, {}).get(style_key)
+                    if text is not None:
+                        style[file_type] = text
+    
+    def get_track_lyrics(self, album_name, track_number):
+        """
+        Every style and transition lyric of a track, or None if the track is unknown
+        Returns {'styles': {style_key: text}, 'transitions': {style_key: text}}.
+        Text captured at upload comes from the track's lyrics.json; lyrics
+        uploaded before it existed are downloaded in parallel and copied into
+        it, so they are only downloaded once. Lyrics over LYRICS_INLINE_MAX_BYTES
+        are left out (players read them from their lyrics_url) and stored as
+        null, so they are not downloaded again either.
+        """
+        track_number = int(track_number)
+        track_info = self._download_json(self._get_file_path(album_name, track_number, 'track_info'))
+        if not track_info:
+            return None
+        
+        stored = self._download_json(self._get_file_path(album_name, track_number, 'track_lyrics')) or {}
+        lyrics = {'styles': {}, 'transitions': {}}
+        missing = []
+        for style_key, style in track_info.get('styles', {}).items():
+            for file_type, group in (('lyrics', 'styles'), ('transition_lyrics', 'transitions')):
+                known = stored.get(group, {})
+                if known.get(style_key) is not None:
+                    lyrics[group][style_key] = known[style_key]
+                elif style_key not in known and style.get(f'{file_type}_url'):
+                    missing.append((file_type, group, style_key))
+        
+        if missing:
+            def read(item):
+                return self.read_track_lyrics(album_name, track_number, item[0], item[2])
+            
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+                texts = list(executor.map(metrics.bind_request(read), missing))
+            for (_, group, style_key), text in zip(missing, texts):
+                if text is not None:
+                    lyrics[group][style_key] = text
+            
+            self._backfill_track_lyrics(album_name, track_number, [
+                (group, style_key, text) for (_, group, style_key), text in zip(missing, texts)
+            ])
+        
+        return lyrics
+    
+    def _backfill_track_lyrics(self, album_name, track_number, texts):
+        """Copy [(group, style_key, text)] read from legacy lyrics files into lyrics.json (None: too large or gone)"""
+        lyrics_path = self._get_file_path(album_name, track_number, 'track_lyrics')
+        
+        def apply(lyrics):
+            for group, style_key, text in texts:
+                # An upload that finished meanwhile already stored the newer text
+                lyrics.setdefault(group, {}).setdefault(style_key, text)
+        
+        try:
+            self._mutate_json(lyrics_path, apply, default=lambda: {'styles': {}, 'transitions': {}})
+        except Exception as e:
+            # Only a cache - the next read downloads the files again
+            print(f"⚠️  Error backfilling lyrics.json for {album_name} Track {track_number}: {e}")
+    
+    def get_track_lyrics_version(self, album_name, track_number):
+        """Version of get_track_lyrics' result (track_info.json + lyrics.json ETags), or None"""
+        track_number = int(track_number)
+        track_etag = self._current_etag(self._get_file_path(album_name, track_number, 'track_info'))
+        if not track_etag:
+            return None
+        return f"{track_etag}:{self._current_etag(self._get_file_path(album_name, track_number, 'track_lyrics'))}"
+    
+    def get_album_version(self, album_name, include_lyrics=False):
+        """
+        Version of load_album_data's result (manifest ETag + unflushed like counts), or None
+        With include_lyrics, every track's lyrics.json ETag is part of it too:
+        lyrics are saved without touching the manifest.
+        """
+        manifest_path = self._get_file_path(album_name, 0, 'manifest')
+        manifest_etag = self._current_etag(manifest_path)
+        if not manifest_etag:
+            return None
+        
+        live_counts = self.like_aggregator.get_counts(album_name) if self.like_aggregator else {}
+        version = f"{manifest_etag}:{sorted(live_counts.items())}"
+        
+        if include_lyrics:
+            manifest = self._download_json(manifest_path) or {'tracks': {}}
+            lyrics_paths = [
+                self._get_file_path(album_name, int(track_key), 'track_lyrics') for track_key in sorted(manifest['tracks'])
+            ]
+            if lyrics_paths:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(lyrics_paths))) as executor:
+                    lyrics_etags = list(executor.map(metrics.bind_request(self._current_etag), lyrics_paths))
+                version = f"{version}:{lyrics_etags}"
+        return version
+    
+    def _update_album_index(self, album_name, entry):
+        """Upsert (or remove, if entry is None) one album in album_index.json"""
+        index_path = self._get_file_path(None, 0, 'album_index')
+        
+        def apply(index):
+            if entry is None:
+                index['albums'].pop(album_name, None)
+            else:
+                index['albums'][album_name] = entry
+        
+        index, _ = self._mutate_json(index_path, apply)
+        
+        if index is None:
+            # First write on a bucket without an index - build it from a full scan
+            self.rebuild_album_index()
+    
+    def _fetch_album_summary(self, album_name):
+        """Build an album index entry from its album_metadata.json"""
+        metadata_path = self._get_file_path(album_name, 0, 'album_metadata')
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=metadata_path)
+            album_metadata = json.loads(response['Body'].read().decode('utf-8'))
+            last_modified = response['LastModified'].isoformat()
+        except Exception:
+            album_metadata, last_modified = {}, None
+        
+        return {
+            'name': album_name,
+            'track_count': album_metadata.get('track_count', 0),
+            'style_count': len(album_metadata.get('styles', [])),
+            'last_modified': last_modified
+        }
+    
+    def rebuild_album_index(self):
+        """Rebuild album_index.json from a paginated scan of every album prefix"""
+        if self.metadata_store:
+            # Albums created since the last sync aren't in the bucket yet
+            self.metadata_store.sync(wait=True)
+        
+        album_names = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix='albums/', Delimiter='/'):
+            for prefix in page.get('CommonPrefixes', []):
+                album_name = prefix['Prefix'][len('albums/'):].rstrip('/')
+                if album_name:
+                    album_names.append(album_name)
+        
+        summaries = []
+        if album_names:
+            workers = min(self.max_workers, len(album_names))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                summaries = list(executor.map(metrics.bind_request(self._fetch_album_summary), album_names))
+        
+        index = {'albums': {summary['name']: summary for summary in summaries}}
+        self._upload_json(index, self._get_file_path(None, 0, 'album_index'))
+        print(f"✅ Album index rebuilt: {len(summaries)} albums")
+        return index
+    
+    def _load_album_index(self):
+        index = self._download_json(self._get_file_path(None, 0, 'album_index'))
+        if index is None:
+            index = self.rebuild_album_index()
+        return index
+    
+    def get_album_index_version(self):
+        """Version of the album list (album_index.json ETag), or None"""
+        return self._current_etag(self._get_file_path(None, 0, 'album_index'))
+    
+    def list_album_summaries(self, sort='name', descending=False, offset=0, limit=None):
+        """List album index entries, sorted and paginated - returns (page, total)"""
+        albums = list(self._load_album_index()['albums'].values())
+        
+        if sort not in ('name', 'track_count', 'style_count', 'last_modified'):
+            sort = 'name'
+        albums.sort(key=lambda album: (album.get(sort) is None, album.get(sort) or 0), reverse=descending)
+        
+        end = offset + limit if limit else None
+        return albums[offset:end], len(albums)
+    
     def list_albums(self):
         """List all albums in R2"""
         try:
-            # List all album folders
-            response = self.s3.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix='albums/',
-                Delimiter='/'
-            )
-            
-            albums = []
-            for prefix in response.get('CommonPrefixes', []):
-                album_name = prefix['Prefix'].replace('albums/', '').replace('/', '')
-                if album_name:
-                    albums.append(album_name)
-            
-            return albums
+            return [album['name'] for album in self.list_album_summaries()[0]]
             
         except Exception as e:
             print(f"Error listing albums: {e}")
@@ -372,6 +1591,13 @@ class R2Manager:
             
             print(f"🗑️ Deleting all objects with prefix: {prefix}")
             
+            # Drop unsynced changes and wait out a sync or like flush in progress so nothing is re-created behind us
+            if self.like_aggregator:
+                self.like_aggregator.forget_album(album_name)
+            if self.metadata_store:
+                self.metadata_store.forget_album(album_name)
+                self.metadata_store.sync(wait=True)
+            
             # List all objects in the album folder
             paginator = self.s3.get_paginator('list_objects_v2')
             pages = paginator.paginate(Bucket=self.bucket_name, Prefix=prefix)
@@ -389,107 +1615,409 @@ class R2Manager:
                         )
                         deleted_count += len(response.get('Deleted', []))
             
+            self.cache.invalidate_prefix(prefix)
+            if self.metadata_store:
+                # Reads made while we were deleting may have loaded documents again
+                self.metadata_store.forget_album(album_name)
+            if self.like_aggregator:
+                # Likes toggled while we were deleting (the flush skips them anyway)
+                self.like_aggregator.forget_album(album_name)
+            self._update_album_index(album_name, None)
             print(f"✅ Deleted {deleted_count} objects from album: {album_name}")
             return True
             
         except Exception as e:
             print(f"Error deleting album: {e}")
-            import traceback
             traceback.print_exc()
             raise Exception(f"Failed to delete album: {e}")
     
-    def store_youtube_link(self, album_name, track_number, file_type, style_key, video_id):
-        """Store YouTube video ID as audio source"""
+    def album_exists(self, album_name):
+        return self._download_json(self._get_file_path(album_name, 0, 'album_metadata')) is not None
+    
+    # Album documents that embed the album's name or public URLs
+    ALBUM_DOCUMENTS = ('track_info.json', 'album_metadata.json', 'manifest.json')
+    
+    def _rewrite_album_refs(self, value, source_album, target_album):
+        """Copy of a JSON document with the album name and public URLs pointed at target_album"""
+        source_url = f"{self.public_url}/albums/{source_album}/"
+        
+        if isinstance(value, dict):
+            return {
+                key: target_album if key in ('album_name', 'albumName') and item == source_album
+                else self._rewrite_album_refs(item, source_album, target_album)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self._rewrite_album_refs(item, source_album, target_album) for item in value]
+        if isinstance(value, str) and value.startswith(source_url):
+            return f"{self.public_url}/albums/{target_album}/{value[len(source_url):]}"
+        return value
+    
+    def clone_album(self, source_album, target_album, progress=None):
+        """
+        Copy an album under a new name using server-side copies (no bytes pass through the app)
+        Copies are fanned out in parallel as the paginated listing arrives. JSON
+        documents holding the album name or public URLs are rewritten instead;
+        the manifest goes last so a half-copied album is never served.
+        Returns the number of objects written.
+        """
+        source_prefix = f'albums/{source_album}/'
+        target_prefix = f'albums/{target_album}/'
+        
+        if not target_album or '/' in target_album or target_album == source_album:
+            raise Exception(f"Invalid album name: {target_album}")
+        if not self.album_exists(source_album):
+            raise Exception(f"Album not found: {source_album}")
+        if self.album_exists(target_album):
+            raise Exception(f"Album already exists: {target_album}")
+        
+        print(f"📋 Cloning album: {source_album} → {target_album}")
+        
+        # Likes and metadata still waiting to be written to R2 would be left behind
+        if self.like_aggregator:
+            self.like_aggregator.flush(wait=True)
+        if self.metadata_store:
+            self.metadata_store.sync(wait=True)
+        
+        def copy(key):
+            self.s3.copy_object(
+                Bucket=self.bucket_name,
+                Key=target_prefix + key[len(source_prefix):],
+                CopySource={'Bucket': self.bucket_name, 'Key': key}
+            )
+        
         try:
-            track_info_path = self._get_file_path(album_name, track_number, 'track_info')
-            track_info = self._download_json(track_info_path)
-            
-            if not track_info:
-                raise Exception("track_info.json not found")
+            documents = []
+            futures = []
+            paginator = self.s3.get_paginator('list_objects_v2')
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # Copies start while later pages are still being listed
+                for page in paginator.paginate(Bucket=self.bucket_name, Prefix=source_prefix):
+                    for obj in page.get('Contents', []):
+                        if obj['Key'].endswith(self.ALBUM_DOCUMENTS):
+                            documents.append(obj['Key'])
+                        else:
+                            futures.append(executor.submit(metrics.bind_request(copy), obj['Key']))
+                
+                for done, future in enumerate(futures, 1):
+                    future.result()
+                    if progress and (done % 50 == 0 or done == len(futures)):
+                        progress(done, len(futures), f'Copied {done} of {len(futures)} files')
             
-            if style_key not in track_info['styles']:
-                track_info['styles'][style_key] = {}
+            if self.metadata_store:
+                # Copied documents (social data, comments) replace whatever this host remembers for the name
+                self.metadata_store.forget_album(target_album)
             
-            if file_type == 'audio':
-                # Don't store URL - just the ID and type
-                track_info['styles'][style_key]['audio_type'] = 'youtube'
-                track_info['styles'][style_key]['youtube_id'] = video_id
-                track_info['styles'][style_key]['uploaded'] = True
-            elif file_type == 'transition_audio':
-                track_info['styles'][style_key]['transition_audio_type'] = 'youtube'
-                track_info['styles'][style_key]['transition_youtube_id'] = video_id
+            # Rewrite track_info.json and album_metadata.json, then the manifest
+            sources = self._download_json_many(documents)
+            pending_writes = [
+                (self._rewrite_album_refs(data, source_album, target_album), target_prefix + key[len(source_prefix):])
+                for key, data in sources.items() if data is not None
+            ]
+            manifest_writes = [item for item in pending_writes if item[1].endswith('manifest.json')]
+            document_writes = [item for item in pending_writes if not item[1].endswith('manifest.json')]
             
-            self._upload_json(track_info, track_info_path)
+            failures = self._upload_json_many(document_writes)
+            if failures:
+                details = ', '.join(f"{path} ({error})" for path, error in sorted(failures.items()))
+                raise Exception(f"{len(failures)} documents failed to write: {details}")
+            for data, path in manifest_writes:
+                self._upload_json(data, path)
+        except Exception:
+            # Don't leave a half-copied album behind
+            try:
+                self.delete_album(target_album)
+            except Exception as e:
+                print(f"⚠️  Error cleaning up {target_album}: {e}")
+            raise
+        
+        summary = self._load_album_index()['albums'].get(source_album) or self._fetch_album_summary(source_album)
+        self._update_album_index(target_album, dict(
+            summary, name=target_album, last_modified=datetime.now(timezone.utc).isoformat()
+        ))
+        
+        written = len(futures) + len(pending_writes)
+        print(f"✅ Cloned {written} objects: {source_album} → {target_album}")
+        return written
+    
+    def rename_album(self, source_album, target_album, progress=None):
+        """Rename an album: clone it under the new name, then delete the original"""
+        written = self.clone_album(source_album, target_album, progress)
+        self.delete_album(source_album)
+        return written
+    
+    def store_youtube_link(self, album_name, track_number, file_type, style_key, video_id):
+        """Store YouTube video ID as audio source"""
+        try:
+            batch = self.batch_track_update(album_name, track_number)
+            result = batch.set_youtube_link(file_type, style_key, video_id)
+            batch.commit()
             print(f"  ✅ YouTube ID stored: {video_id}")
             
-            return f"youtube:{video_id}"
+            return result
             
         except Exception as e:
             raise Exception(f"Error storing YouTube link: {e}")
     
+    def _apply_live_like_counts(self, album_name, album_data):
+        """Overlay like counts that have not been flushed to R2 yet"""
+        if not self.like_aggregator:
+            return
+        
+        for track_number, count in self.like_aggregator.get_counts(album_name).items():
+            track_data = album_data['tracks'].get(str(track_number))
+            if track_data:
+                track_data['social']['likes'] = count
+    
+    def apply_like_deltas(self, album_name, track_number, deltas):
+        """Apply {user_id: liked} changes to social_data.json in one write, returns None if the album is gone"""
+        # Never re-create social_data.json under a deleted album - it would bring the album back
+        metadata_path = self._get_file_path(album_name, 0, 'album_metadata')
+        if self._download_json_with_etag(metadata_path, use_cache=False)[0] is None:
+            print(f"⏭️  Dropping like changes for deleted album {album_name} Track {track_number}")
+            return None
+        
+        social_path = self._get_file_path(album_name, track_number, 'social_data')
+        
+        def apply(social_data):
+            likes = [user_id for user_id in social_data['likes'] if deltas.get(user_id, True)]
+            existing = set(likes)
+            likes.extend(user_id for user_id, liked in deltas.items() if liked and user_id not in existing)
+            
+            social_data['likes'] = likes
+            social_data['like_count'] = len(likes)
+        
+        social_data, _ = self._mutate_json(
+            social_path, apply, default=lambda: {"likes": [], "like_count": 0, "comments": []}
+        )
+        
+        self._patch_manifest_track(album_name, track_number=track_number, social_counts={'likes': social_data['like_count']})
+        return social_data
+    
     def toggle_like(self, album_name, track_number, user_id):
         """Toggle like for a track"""
         try:
-            social_path = self._get_file_path(album_name, track_number, 'social_data')
-            social_data = self._download_json(social_path)
-            
-            if not social_data:
-                social_data = {"likes": [], "like_count": 0, "comments": []}
-            
-            if user_id in social_data['likes']:
-                social_data['likes'].remove(user_id)
-                liked = False
-            else:
-                social_data['likes'].append(user_id)
-                liked = True
+            track_number = int(track_number)
             
-            social_data['like_count'] = len(social_data['likes'])
+            if self.like_aggregator:
+                return self.like_aggregator.toggle(album_name, track_number, user_id)
             
-            self._upload_json(social_data, social_path)
+            social_path = self._get_file_path(album_name, track_number, 'social_data')
+            social_data = self._download_json(social_path)
+            liked = not (social_data and user_id in set(social_data.get('likes', [])))
             
+            social_data = self.apply_like_deltas(album_name, track_number, {user_id: liked})
+            if social_data is None:
+                raise Exception(f"Album not found: {album_name}")
             return {'liked': liked, 'count': social_data['like_count']}
             
         except Exception as e:
             raise Exception(f"Error toggling like: {e}")
     
+    def _load_comments_head(self, album_name, track_number):
+        """Load a track's comment head, migrating the legacy comments array on first use"""
+        head_path = self._get_file_path(album_name, track_number, 'comments_head')
+        head = self._download_json(head_path)
+        
+        if head:
+            return head
+        
+        head = self._migrate_legacy_comments(album_name, track_number)
+        if head['count']:
+            try:
+                self._upload_json(head, head_path, if_none_match='*')
+            except ClientError as e:
+                if not self._is_precondition_failure(e):
+                    raise
+                # Another worker finished the migration first
+                return self._download_json_with_etag(head_path, use_cache=False)[0]
+            print(f"  ✅ Migrated {head['count']} comments for Track {track_number}")
+        
+        return head
+    
+    def _migrate_legacy_comments(self, album_name, track_number):
+        """
+        Write a track's legacy social_data comments as segments and return the
+        matching head - the head itself is left to the caller to write.
+        """
+        head = {"next_id": 1, "count": 0, "segment_size": self.COMMENT_SEGMENT_SIZE}
+        
+        social_path = self._get_file_path(album_name, track_number, 'social_data')
+        social_data = self._download_json(social_path)
+        legacy = social_data.get('comments', []) if social_data else []
+        
+        if legacy:
+            # Legacy IDs came from len()+1 and may collide - renumber in order
+            segments = {}
+            for comment_id, comment in enumerate(legacy, start=1):
+                comment = dict(comment, id=comment_id)
+                segments.setdefault((comment_id - 1) // head['segment_size'], []).append(comment)
+            
+            for index, comments in segments.items():
+                segment_path = self._get_file_path(album_name, track_number, 'comments_segment', index)
+                try:
+                    # Never replace a segment another worker already migrated (and may have appended to)
+                    self._upload_json({"comments": comments}, segment_path, if_none_match='*')
+                except ClientError as e:
+                    if not self._is_precondition_failure(e):
+                        raise
+            head['next_id'] = len(legacy) + 1
+            head['count'] = len(legacy)
+        
+        return head
+    
     def add_comment(self, album_name, track_number, user_name, comment_text):
-        """Add a comment to a track"""
+        """Add a comment to a track (writes the small head and one bounded segment)"""
         try:
-            from datetime import datetime
+            track_number = int(track_number)
+            head_path = self._get_file_path(album_name, track_number, 'comments_head')
             
-            social_path = self._get_file_path(album_name, track_number, 'social_data')
-            social_data = self._download_json(social_path)
+            def reserve_id(head):
+                comment_id = head['next_id']
+                head['next_id'] += 1
+                head['count'] += 1
+                return comment_id
             
-            if not social_data:
-                social_data = {"likes": [], "like_count": 0, "comments": []}
+            # Reserve the ID first with a conditional write so it is never handed out twice.
+            # A legacy track's migrated head is written by this same write
+            head, comment_id = self._mutate_json(
+                head_path, reserve_id, default=lambda: self._migrate_legacy_comments(album_name, track_number)
+            )
             
             comment = {
-                "id": len(social_data['comments']) + 1,
+                "id": comment_id,
                 "user": user_name,
                 "text": comment_text,
                 "timestamp": datetime.now().isoformat()
             }
             
-            social_data['comments'].append(comment)
+            segment_index = (comment_id - 1) // head['segment_size']
+            segment_path = self._get_file_path(album_name, track_number, 'comments_segment', segment_index)
             
-            self._upload_json(social_data, social_path)
+            # A new segment starts empty - no need to read it first
+            self._mutate_json(
+                segment_path,
+                lambda segment: segment['comments'].append(comment),
+                default=lambda: {"comments": []},
+                assume_missing=(comment_id - 1) % head['segment_size'] == 0
+            )
+            
+            self._patch_manifest_track(album_name, track_number=track_number, social_counts={'comments': head['count']})
             
             return comment
             
         except Exception as e:
             raise Exception(f"Error adding comment: {e}")
     
-    def get_comments(self, album_name, track_number):
-        """Get all comments for a track"""
+    def get_comments_version(self, album_name, track_number):
+        """Version of a track's comments (head ETag - every append rewrites the head), or None"""
+        track_number = int(track_number)
+        head_etag = self._current_etag(self._get_file_path(album_name, track_number, 'comments_head'))
+        if head_etag:
+            return head_etag
+        
+        # Not migrated yet - comments still come from the legacy social_data array
+        return self._download_json_with_etag(self._get_file_path(album_name, track_number, 'social_data'))[1]
+    
+    def get_comments(self, album_name, track_number, cursor=None, limit=20):
+        """
+        Get a page of comments for a track, newest first
+        cursor is the ID to continue before; returns {'comments', 'next_cursor'}.
+        """
         try:
-            social_path = self._get_file_path(album_name, track_number, 'social_data')
-            social_data = self._download_json(social_path)
+            track_number = int(track_number)
+            head = self._load_comments_head(album_name, track_number)
+            segment_size = head['segment_size']
             
-            if not social_data:
-                return []
+            before = min(cursor, head['next_id']) if cursor else head['next_id']
+            segment_index = (before - 2) // segment_size
+            comments = []
             
-            return social_data.get('comments', [])
+            # Walk backwards through only the segments this page needs
+            while len(comments) < limit and segment_index >= 0 and before > 1:
+                segment_path = self._get_file_path(album_name, track_number, 'comments_segment', segment_index)
+                segment = self._download_json(segment_path) or {"comments": []}
+                
+                newer_first = sorted(
+                    (c for c in segment['comments'] if c['id'] < before),
+                    key=lambda c: c['id'],
+                    reverse=True
+                )
+                comments.extend(newer_first[:limit - len(comments)])
+                segment_index -= 1
+            
+            next_cursor = None
+            if len(comments) == limit and comments[-1]['id'] > 1:
+                next_cursor = comments[-1]['id']
+            
+            return {'comments': comments, 'next_cursor': next_cursor}
             
         except Exception as e:
             print(f"Error getting comments: {e}")
-            return []
+            return {'comments': [], 'next_cursor': None}
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Music Wheel R2 maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    rebuild_parser = subparsers.add_parser('rebuild-manifest', help='Rebuild album manifest.json')
+    rebuild_parser.add_argument('albums', nargs='*', help='Album names (default: all albums)')
+    
+    subparsers.add_parser('rebuild-index', help='Rebuild album_index.json from a full bucket scan')
+    
+    cors_parser = subparsers.add_parser('configure-cors', help='Allow direct browser uploads to the bucket')
+    cors_parser.add_argument('origins', nargs='+', help='Site origins, e.g. https://music.example.com')
+    
+    hls_parser = subparsers.add_parser('build-hls', help='Build missing HLS renditions (needs ffmpeg)')
+    hls_parser.add_argument('albums', nargs='*', help='Album names (default: all albums)')
+    
+    clone_parser = subparsers.add_parser('clone-album', help='Copy an album under a new name (server-side)')
+    clone_parser.add_argument('source')
+    clone_parser.add_argument('target')
+    clone_parser.add_argument('--rename', action='store_true', help='Delete the original afterwards')
+    
+    subparsers.add_parser('sync-metadata', help='Write locally changed metadata documents to R2 now')
+    
+    reload_parser = subparsers.add_parser('reload-metadata', help='Re-read albums\' metadata from R2 (after editing the bucket directly)')
+    reload_parser.add_argument('albums', nargs='+', help='Album names')
+    
+    args = parser.parse_args()
+    manager = R2Manager()
+    
+    if args.command == 'rebuild-manifest':
+        for album_name in args.albums or manager.list_albums():
+            if not manager.rebuild_manifest(album_name):
+                print(f"⚠️  Album not found: {album_name}")
+    elif args.command == 'rebuild-index':
+        manager.rebuild_album_index()
+    elif args.command == 'configure-cors':
+        manager.configure_upload_cors(args.origins)
+    elif args.command == 'build-hls':
+        from transcoder import HLSTranscoder
+        transcoder = HLSTranscoder(os.environ.get('FFMPEG_PATH', 'ffmpeg'))
+        if not transcoder.available():
+            parser.error('ffmpeg not found')
+        
+        for album_name in args.albums or manager.list_albums():
+            album_data = manager.load_album_data(album_name) or {'tracks': {}}
+            for track in album_data['tracks'].values():
+                for style_key, style in track['styles'].items():
+                    if style.get('url') and not style.get('hls_url'):
+                        manager.build_hls_renditions(album_name, track['number'], style_key, transcoder)
+    elif args.command == 'clone-album':
+        if args.rename:
+            manager.rename_album(args.source, args.target)
+        else:
+            manager.clone_album(args.source, args.target)
+    elif args.command in ('sync-metadata', 'reload-metadata'):
+        if os.environ.get('METADATA_STORE', '1') == '0':
+            parser.error('the metadata store is disabled (METADATA_STORE=0)')
+        # The server's store file, without taking its lease or starting background threads
+        store = MetadataStore(manager, db_path=os.environ.get('METADATA_STORE_PATH', 'metadata.db'), background=False)
+        store.sync(wait=True)
+        for album_name in getattr(args, 'albums', []):
+            store.forget_album(album_name)
+            print(f"🔄 {album_name} will be reloaded from R2")
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import file_lock
+
+
+class _Call:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent fetches of the same key into one upstream request
+    Within a process, callers share the result of a fetch that started after
+    they arrived; one that finds an older fetch in flight waits for it and
+    then shares the next one, so a burst costs at most two fetches. Across gunicorn workers, the leader of each key
+    holds a lock file while fetching and leaves the result in a shared file;
+    a worker that was waiting on the lock reuses a result whose fetch started
+    after it arrived (so it still sees every write that finished before it
+    asked) instead of fetching again. Results must be JSON-serializable.
+    """
+    
+    def __init__(self, shared_dir=None, lock_timeout=10.0, retention_seconds=3600):
+        self.shared_dir = shared_dir
+        self.lock_timeout = lock_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'fetches': 0, 'coalesced': 0, 'shared': 0, 'lock_timeouts': 0}
+        
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+            self._purge(retention_seconds)
+    
+    def _record(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    def do(self, key, fetch):
+        """Return fetch()'s result, sharing it with concurrent callers for the same key"""
+        arrived = time.monotonic()
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            
+            if leader:
+                break
+            
+            call.done.wait()
+            # A fetch that began before we asked may predate a write we must see
+            if call.started_at >= arrived:
+                self._record('coalesced')
+                if call.error:
+                    raise call.error
+                return call.result
+        
+        try:
+            call.result = self._fetch_shared(key, fetch) if self.shared_dir else self._fetch(fetch)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def _fetch(self, fetch):
+        self._record('fetches')
+        return fetch()
+    
+    def _fetch_shared(self, key, fetch):
+        """Fetch under the key's lock file, reusing a result another worker fetched meanwhile"""
+        arrived = time.time()
+        path = os.path.join(self.shared_dir, hashlib.sha256(key.encode('utf-8')).hexdigest())
+        
+        with open(f"{path}.lock", 'w') as lock_file:
+            if not file_lock.acquire(lock_file, self.lock_timeout):
+                # Lock holder is stuck - don't let it stall this request
+                self._record('lock_timeouts')
+                return self._fetch(fetch)
+            
+            try:
+                with open(path) as f:
+                    shared = json.load(f)
+                if shared['started_at'] >= arrived:
+                    self._record('shared')
+                    return shared['result']
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+            
+            # A fetch that began before a waiter arrived may predate writes it must see
+            started = time.time()
+            result = self._fetch(fetch)
+            
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, 'w') as f:
+                    json.dump({'started_at': started, 'result': result}, f)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"⚠️  Error sharing fetch result: {e}")
+            return result
+    
+    def _purge(self, retention_seconds):
+        """Remove shared results and lock files of keys not fetched recently"""
+        cutoff = time.time() - retention_seconds
+        for name in os.listdir(self.shared_dir):
+            path = os.path.join(self.shared_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._calls)
+            return stats
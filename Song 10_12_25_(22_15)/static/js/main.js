@@ -358,7 +358,9 @@ class MusicWheelApp {
                         url: styleData.url || null,
                         youtube_id: styleData.youtube_id || null,
                         audio_type: styleData.audio_type || 'file',
-                        lyrics_url: styleData.lyrics_url || null
+                        hls_url: styleData.hls_url || null,
+                        lyrics_url: styleData.lyrics_url || null,
+                        lyrics: null
                     };
                 }
             });
@@ -429,7 +431,7 @@ class MusicWheelApp {
         // Update lyrics preview
         const lyricsPreview = document.getElementById('lyricsPreview');
         if (styleData.lyrics_url) {
-            await this.loadLyrics(styleData.lyrics_url);
+            await this.loadLyrics(segment, style);
             const lyricsText = document.getElementById('lyricsText').textContent;
             if (lyricsPreview) {
                 lyricsPreview.textContent = lyricsText.substring(0, 200) + '...';
@@ -453,12 +455,7 @@ class MusicWheelApp {
                 console.log('🎬 Playing YouTube:', styleData.youtube_id);
                 await this.player.loadYouTube(styleData.youtube_id);
             } else if (styleData.url) {
-                // Use proxy for R2 files to avoid CORS
-                const audioUrl = styleData.url.includes('r2.dev') 
-                    ? `/api/proxy/audio?url=${encodeURIComponent(styleData.url)}`
-                    : styleData.url;
-                console.log('🎵 Playing file:', audioUrl);
-                await this.player.loadTrack(audioUrl);
+                await this.loadFileAudio(styleData);
             } else {
                 console.error('❌ No audio source available');
                 this.ui.updateStatus('אין קובץ אודיו זמין', 'error');
@@ -473,6 +470,26 @@ class MusicWheelApp {
         }
     }
     
+    // Prefer the adaptive HLS stream; the full MP3 is the fallback
+    async loadFileAudio(styleData) {
+        if (styleData.hls_url) {
+            try {
+                console.log('📶 Streaming HLS:', styleData.hls_url);
+                await this.player.loadStream(styleData.hls_url);
+                return;
+            } catch (error) {
+                console.warn('HLS playback failed, falling back to MP3:', error);
+            }
+        }
+        
+        // Use proxy for R2 files to avoid CORS
+        const audioUrl = styleData.url.includes('r2.dev') 
+            ? `/api/proxy/audio?url=${encodeURIComponent(styleData.url)}`
+            : styleData.url;
+        console.log('🎵 Loading file:', audioUrl);
+        await this.player.loadTrack(audioUrl);
+    }
+    
     async switchStyle(newStyle) {
         if (!this.currentSegment || newStyle === this.currentStyle) return;
         
@@ -503,12 +520,7 @@ class MusicWheelApp {
                 console.log('🎬 Switching to YouTube:', styleData.youtube_id);
                 await this.player.loadYouTube(styleData.youtube_id);
             } else if (styleData.url) {
-                // Use proxy for R2 files to avoid CORS
-                const audioUrl = styleData.url.includes('r2.dev') 
-                    ? `/api/proxy/audio?url=${encodeURIComponent(styleData.url)}`
-                    : styleData.url;
-                console.log('🎵 Switching to file:', audioUrl);
-                await this.player.loadTrack(audioUrl);
+                await this.loadFileAudio(styleData);
             }
             
             this.player.seek(currentTime);
@@ -520,7 +532,7 @@ class MusicWheelApp {
             // Update lyrics
             const lyricsBtnCenter = document.getElementById('lyricsBtnCenter');
             if (styleData.lyrics_url) {
-                this.loadLyrics(styleData.lyrics_url);
+                this.loadLyrics(this.currentSegment, newStyle);
                 if (lyricsBtnCenter) lyricsBtnCenter.classList.add('visible');
             } else {
                 document.getElementById('lyricsText').textContent = 'No lyrics available';
@@ -532,13 +544,23 @@ class MusicWheelApp {
         }
     }
     
-    async loadLyrics(url) {
+    async loadLyrics(segment, style) {
         try {
-            const response = await fetch(url);
-            const text = await response.text();
+            const trackData = this.albumData.tracks[segment];
+            const styleData = trackData.styles[style];
+            
+            // Lyrics aren't part of the album load: one request covers every style
+            if (styleData.lyrics === null && !trackData.lyricsFetched) {
+                await this.fetchTrackLyrics(trackData);
+            }
+            if (styleData.lyrics === null) {
+                const response = await fetch(styleData.lyrics_url);
+                styleData.lyrics = await response.text();
+            }
+            
             const lyricsText = document.getElementById('lyricsText');
             if (lyricsText) {
-                lyricsText.textContent = text;
+                lyricsText.textContent = styleData.lyrics;
             }
         } catch (error) {
             console.error('Error loading lyrics:', error);
@@ -549,6 +571,23 @@ class MusicWheelApp {
         }
     }
     
+    async fetchTrackLyrics(trackData) {
+        const response = await fetch(
+            `/api/track/lyrics?album=${encodeURIComponent(this.currentAlbumName)}&track=${trackData.number}`
+        );
+        const result = await response.json();
+        if (result.status !== 'success') {
+            throw new Error(result.message);
+        }
+        
+        trackData.lyricsFetched = true;
+        Object.entries(result.lyrics.styles).forEach(([styleKey, text]) => {
+            if (trackData.styles[styleKey]) {
+                trackData.styles[styleKey].lyrics = text;
+            }
+        });
+    }
+    
     updatePlayButton(isPlaying) {
         const playIcon = document.getElementById('playIcon');
         const pauseIcon = document.getElementById('pauseIcon');
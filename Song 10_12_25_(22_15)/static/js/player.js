@@ -12,17 +12,40 @@ class MusicPlayer {
         this.onTimeUpdate = null;
         this.onEnded = null;
         
+        this.audio = null;
+        this.hls = null;
+        
         // Initialize Tone.js (if available)
-        if (typeof Tone !== 'undefined') {
+        this.toneAvailable = typeof Tone !== 'undefined';
+        if (this.toneAvailable) {
             this.useTone = true;
             Tone.Transport.start();
             console.log('✓ Using Tone.js');
         } else {
             this.useTone = false;
-            this.audio = new Audio();
-            this.audio.volume = this.volume;
+            this.ensureAudioElement();
             console.log('✓ Using Web Audio API');
-            this.setupWebAudioListeners();
+        }
+    }
+    
+    // Media element used without Tone.js and for HLS streams
+    ensureAudioElement() {
+        if (this.audio) return;
+        this.audio = new Audio();
+        this.audio.volume = this.volume;
+        this.setupWebAudioListeners();
+    }
+    
+    // Tone.js buffers whole files, so streams always play through the media element
+    setBackend(useTone) {
+        if (this.useTone !== useTone) {
+            this.pause();
+            this.useTone = useTone;
+        }
+        
+        if (this.hls) {
+            this.hls.destroy();
+            this.hls = null;
         }
     }
     
@@ -56,6 +79,7 @@ class MusicPlayer {
     // Load a track from URL
     async loadTrack(url) {
         console.log('Loading track:', url);
+        this.setBackend(this.toneAvailable);
         
         if (this.useTone) {
             return this.loadWithTone(url);
@@ -124,6 +148,48 @@ class MusicPlayer {
         });
     }
     
+    // Load an HLS stream (adaptive bitrate) via hls.js or native playback
+    async loadStream(url) {
+        console.log('Loading stream:', url);
+        this.setBackend(false);
+        this.ensureAudioElement();
+        
+        if (typeof Hls !== 'undefined' && Hls.isSupported()) {
+            return new Promise((resolve, reject) => {
+                const currentTime = this.audio.currentTime || 0;
+                const hls = new Hls();
+                this.hls = hls;
+                
+                hls.on(Hls.Events.MANIFEST_PARSED, () => {
+                    if (currentTime > 0) {
+                        this.audio.currentTime = currentTime;
+                    }
+                    resolve();
+                });
+                
+                hls.on(Hls.Events.ERROR, (event, data) => {
+                    if (data.fatal) {
+                        hls.destroy();
+                        if (this.hls === hls) {
+                            this.hls = null;
+                        }
+                        reject(new Error(`HLS error: ${data.details}`));
+                    }
+                });
+                
+                hls.loadSource(url);
+                hls.attachMedia(this.audio);
+            });
+        }
+        
+        // Safari plays HLS natively
+        if (this.audio.canPlayType('application/vnd.apple.mpegurl')) {
+            return this.loadWithWebAudio(url);
+        }
+        
+        throw new Error('HLS playback not supported');
+    }
+    
     // Load YouTube video (embed as iframe with hidden video)
     async loadYouTube(videoId) {
         console.log('🎬 Loading YouTube video:', videoId);
@@ -316,7 +382,8 @@ class MusicPlayer {
         // Tone.js
         if (this.useTone && this.player) {
             this.player.volume.value = Tone.gainToDb(this.volume);
-        } else {
+        }
+        if (this.audio) {
             this.audio.volume = this.volume;
         }
     }
@@ -360,6 +427,11 @@ class MusicPlayer {
         if (this.useTone && this.player) {
             this.player.dispose();
         }
+        
+        if (this.hls) {
+            this.hls.destroy();
+            this.hls = null;
+        }
     }
 }
 
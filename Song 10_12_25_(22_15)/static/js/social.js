@@ -6,6 +6,7 @@ class SocialManager {
         this.userId = this.getUserId();
         this.currentAlbum = null;
         this.currentTrack = null;
+        this.commentsCursor = null;
     }
 
     getUserId() {
@@ -81,14 +82,18 @@ class SocialManager {
         }
     }
 
-    async loadComments() {
+    // Load a page of comments (newest first); pass cursor to continue to older ones
+    async loadComments(cursor = null) {
         if (!this.currentAlbum || !this.currentTrack) return [];
 
         try {
-            const response = await fetch(
-                `/api/social/comments?album=${encodeURIComponent(this.currentAlbum)}&track=${this.currentTrack}`
-            );
+            let url = `/api/social/comments?album=${encodeURIComponent(this.currentAlbum)}&track=${this.currentTrack}`;
+            if (cursor) {
+                url += `&cursor=${cursor}`;
+            }
+            const response = await fetch(url);
             const data = await response.json();
+            this.commentsCursor = data.next_cursor || null;
             return data.status === 'success' ? data.comments : [];
         } catch (error) {
             console.error('Error loading comments:', error);
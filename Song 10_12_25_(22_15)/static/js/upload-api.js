@@ -5,6 +5,9 @@
 class UploadAPI {
     constructor(uiManager) {
         this.ui = uiManager;
+        this.partConcurrency = 4; // parallel PUTs to R2 per track
+        this.trackConcurrency = 2; // tracks uploading at the same time
+        this.jobPollInterval = 500;
     }
 
     // Initialize album structure on server
@@ -26,15 +29,10 @@ class UploadAPI {
                 })
             });
 
-            const result = await response.json();
+            const result = await this.waitForJob(await response.json());
             
             if (result.status === 'success') {
-                // Simulate progress for visual feedback
-                for (let i = 1; i <= trackCount; i++) {
-                    this.ui.updateProgress(i, trackCount, `Created Track ${i}/${trackCount}`);
-                    await new Promise(resolve => setTimeout(resolve, 100));
-                }
-                
+                this.ui.updateProgress(trackCount, trackCount, `Created ${trackCount} tracks`);
                 this.ui.hideProgressModal();
                 return { success: true };
             } else {
@@ -48,26 +46,30 @@ class UploadAPI {
         }
     }
 
-    // Upload all tracks
+    // Upload all tracks (several at a time - the server finishes each one in the background)
     async uploadAllTracks(albumName, trackCount, tracks, styles) {
         this.ui.showProgressModal('Uploading Tracks');
         const results = [];
+        let finished = 0;
 
+        const tasks = [];
         for (let trackNum = 1; trackNum <= trackCount; trackNum++) {
-            this.ui.updateProgress(trackNum - 1, trackCount, `Uploading Track ${trackNum}/${trackCount}...`);
-
-            const track = tracks[trackNum];
-            if (!track) {
-                results.push({ trackNum, result: { success: false, error: 'No track data' } });
-                continue;
-            }
+            tasks.push(async () => {
+                const track = tracks[trackNum];
+                const result = track
+                    ? await this.uploadTrack(albumName, trackNum, track, styles)
+                    : { success: false, error: 'No track data' };
+                results.push({ trackNum, result });
 
-            const result = await this.uploadTrack(albumName, trackNum, track, styles);
-            results.push({ trackNum, result });
-
-            await new Promise(resolve => setTimeout(resolve, 200));
+                finished++;
+                this.ui.updateProgress(finished, trackCount, `Uploaded ${finished}/${trackCount} tracks...`);
+            });
         }
 
+        this.ui.updateProgress(0, trackCount, `Uploading ${trackCount} tracks...`);
+        await this.runWithConcurrency(tasks, this.trackConcurrency);
+        results.sort((a, b) => a.trackNum - b.trackNum);
+
         this.ui.updateProgress(trackCount, trackCount, 'Upload complete!');
         await new Promise(resolve => setTimeout(resolve, 1000));
         this.ui.hideProgressModal();
@@ -75,89 +77,223 @@ class UploadAPI {
         return results;
     }
 
-    // Upload single track
+    // Sort a track's files into upload keys ("track_rock", "lyrics_rock", ...) and YouTube links
+    collectTrackFiles(track, styles) {
+        const files = {};
+        const youtube = {};
+
+        // Add icon
+        if (track.icon) {
+            files['icon'] = track.icon;
+        }
+
+        Object.entries(track.files || {}).forEach(([key, file]) => {
+            // Parse key: "track1-track-0-mp3" or "track1-transition-0-lyrics"
+            const parts = key.split('-');
+            const type = parts[1]; // "track" or "transition"
+            const styleIdx = parseInt(parts[2]);
+            const fileType = parts[3]; // "mp3" or "lyrics"
+
+            const styleName = styles[styleIdx].name.toLowerCase().replace(/\s+/g, '_');
+
+            // Handle YouTube links
+            if (file.youtube) {
+                if (type === 'track' || type === 'transition') {
+                    youtube[`youtube_${type}_${styleName}`] = file.youtube;
+                }
+            } else if (type === 'track') {
+                files[fileType === 'mp3' ? `track_${styleName}` : `lyrics_${styleName}`] = file;
+            } else if (type === 'transition') {
+                files[fileType === 'mp3' ? `transition_${styleName}` : `transition_lyrics_${styleName}`] = file;
+            }
+        });
+
+        return { files, youtube };
+    }
+
+    // Upload single track (directly to R2, falling back to uploading through the server)
     async uploadTrack(albumName, trackNumber, track, styles) {
+        const { files, youtube } = this.collectTrackFiles(track, styles);
+
+        console.log(`📤 Uploading Track ${trackNumber}:`, {
+            name: track.name,
+            artist: track.artist,
+            files: Object.keys(files).length
+        });
+
         try {
-            const formData = new FormData();
-            formData.append('album', albumName);
-            formData.append('number', trackNumber);
-            formData.append('name', track.name || `Track ${trackNumber}`);
-            formData.append('artist', track.artist || 'Unknown Artist');
-
-            // Add icon
-            if (track.icon) {
-                formData.append('icon', track.icon);
-            }
+            const result = await this.waitForJob(await this.uploadTrackDirect(albumName, trackNumber, track, files, youtube));
+            this.logUploadResult(trackNumber, result);
+            return result;
+        } catch (error) {
+            console.warn(`⚠️ Direct upload of Track ${trackNumber} failed, uploading through server:`, error);
+        }
 
-            // Add files for each style
-            const styleData = {};
-            
-            Object.entries(track.files || {}).forEach(([key, file]) => {
-                // Parse key: "track1-track-0-mp3" or "track1-transition-0-lyrics"
-                const parts = key.split('-');
-                const type = parts[1]; // "track" or "transition"
-                const styleIdx = parseInt(parts[2]);
-                const fileType = parts[3]; // "mp3" or "lyrics"
-                
-                const styleName = styles[styleIdx].name.toLowerCase().replace(/\s+/g, '_');
-                
-                // Handle YouTube links
-                if (file.youtube) {
-                    if (type === 'track') {
-                        formData.append(`youtube_track_${styleName}`, file.youtube);
-                    } else if (type === 'transition') {
-                        formData.append(`youtube_transition_${styleName}`, file.youtube);
-                    }
-                } else {
-                    // Handle file uploads
-                    if (type === 'track') {
-                        if (fileType === 'mp3') {
-                            formData.append(`track_${styleName}`, file);
-                        } else if (fileType === 'lyrics') {
-                            formData.append(`lyrics_${styleName}`, file);
-                        }
-                    } else if (type === 'transition') {
-                        if (fileType === 'mp3') {
-                            formData.append(`transition_${styleName}`, file);
-                        } else if (fileType === 'lyrics') {
-                            formData.append(`transition_lyrics_${styleName}`, file);
-                        }
-                    }
-                }
+        try {
+            const result = await this.waitForJob(await this.uploadTrackViaServer(albumName, trackNumber, track, files, youtube));
+            this.logUploadResult(trackNumber, result);
+            return result;
+        } catch (error) {
+            console.error(`Error uploading track ${trackNumber}:`, error);
+            return { status: 'error', message: error.message };
+        }
+    }
+
+    logUploadResult(trackNumber, result) {
+        if (result.status === 'success') {
+            console.log(`✅ Track ${trackNumber} uploaded successfully`);
+        } else {
+            console.error(`❌ Track ${trackNumber} upload failed:`, result.message);
+        }
+    }
+
+    // Browser -> R2 with presigned URLs; the server only signs and verifies
+    async uploadTrackDirect(albumName, trackNumber, track, files, youtube) {
+        const sizes = {};
+        Object.entries(files).forEach(([key, file]) => { sizes[key] = file.size; });
+
+        const presign = await this.postJSON('/api/upload/presign', {
+            album: albumName,
+            number: trackNumber,
+            files: sizes
+        });
+        if (presign.status !== 'success') {
+            throw new Error(presign.message);
+        }
 
-                // Track which styles have data
-                if (!styleData[styleName]) {
-                    styleData[styleName] = {};
+        const completed = {};
+        try {
+            // Every single PUT and multipart part shares one pool of parallel requests
+            const tasks = [];
+            Object.entries(presign.uploads).forEach(([key, upload]) => {
+                const file = files[key];
+                completed[key] = { size: file.size };
+
+                if (upload.method === 'put') {
+                    tasks.push(() => this.putWithRetry(upload.url, file, { 'Content-Type': upload.content_type }));
+                    return;
                 }
-                styleData[styleName][`${type}_${fileType}`] = true;
+
+                completed[key].upload_id = upload.upload_id;
+                completed[key].parts = [];
+                upload.parts.forEach(part => {
+                    const start = (part.part_number - 1) * upload.part_size;
+                    const blob = file.slice(start, start + upload.part_size);
+                    tasks.push(async () => {
+                        const response = await this.putWithRetry(part.url, blob);
+                        completed[key].parts.push({ part_number: part.part_number, etag: response.headers.get('ETag') });
+                    });
+                });
             });
 
-            formData.append('styles', JSON.stringify(styleData));
+            await this.runWithConcurrency(tasks, this.partConcurrency);
+        } catch (error) {
+            await this.abortMultipartUploads(albumName, trackNumber, completed);
+            throw error;
+        }
 
-            console.log(`📤 Uploading Track ${trackNumber}:`, {
-                name: track.name,
-                artist: track.artist,
-                files: Object.keys(track.files || {}).length
-            });
+        return this.postJSON('/api/upload/complete', {
+            album: albumName,
+            number: trackNumber,
+            name: track.name || `Track ${trackNumber}`,
+            artist: track.artist || 'Unknown Artist',
+            files: completed,
+            youtube: youtube
+        });
+    }
 
-            const response = await fetch('/api/upload/track', {
-                method: 'POST',
-                body: formData
-            });
+    async uploadTrackViaServer(albumName, trackNumber, track, files, youtube) {
+        const formData = new FormData();
+        formData.append('album', albumName);
+        formData.append('number', trackNumber);
+        formData.append('name', track.name || `Track ${trackNumber}`);
+        formData.append('artist', track.artist || 'Unknown Artist');
 
-            const result = await response.json();
-            
-            if (result.status === 'success') {
-                console.log(`✅ Track ${trackNumber} uploaded successfully`);
-            } else {
-                console.error(`❌ Track ${trackNumber} upload failed:`, result.message);
+        Object.entries(youtube).forEach(([key, url]) => formData.append(key, url));
+        Object.entries(files).forEach(([key, file]) => formData.append(key, file));
+
+        const response = await fetch('/api/upload/track', {
+            method: 'POST',
+            body: formData
+        });
+        return response.json();
+    }
+
+    async putWithRetry(url, body, headers = {}, attempts = 3) {
+        for (let attempt = 1; ; attempt++) {
+            try {
+                const response = await fetch(url, { method: 'PUT', body, headers });
+                if (response.ok) {
+                    return response;
+                }
+                if (attempt >= attempts || response.status < 500) {
+                    throw new Error(`Upload failed with HTTP ${response.status}`);
+                }
+            } catch (error) {
+                if (attempt >= attempts) {
+                    throw error;
+                }
             }
+            await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+        }
+    }
 
+    async runWithConcurrency(tasks, limit) {
+        let next = 0;
+        const worker = async () => {
+            while (next < tasks.length) {
+                await tasks[next++]();
+            }
+        };
+        await Promise.all(Array.from({ length: Math.min(limit, tasks.length) }, worker));
+    }
+
+    async abortMultipartUploads(albumName, trackNumber, completed) {
+        const aborts = Object.entries(completed)
+            .filter(([, upload]) => upload.upload_id)
+            .map(([key, upload]) => this.postJSON('/api/upload/abort', {
+                album: albumName,
+                number: trackNumber,
+                key: key,
+                upload_id: upload.upload_id
+            }).catch(error => console.warn(`⚠️ Could not abort upload of ${key}:`, error)));
+        await Promise.all(aborts);
+    }
+
+    // Follow a queued (202) response until its background job finishes
+    async waitForJob(result, onProgress = null) {
+        if (result.status !== 'queued') {
             return result;
+        }
 
-        } catch (error) {
-            console.error(`Error uploading track ${trackNumber}:`, error);
-            return { status: 'error', message: error.message };
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, this.jobPollInterval));
+
+            const response = await fetch(`/api/jobs/${result.job_id}`);
+            const status = await response.json();
+            if (status.status !== 'success') {
+                return status;
+            }
+
+            const job = status.job;
+            if (job.state === 'succeeded') {
+                return { status: 'success', ...job.result };
+            }
+            if (job.state === 'failed') {
+                return { status: 'error', message: job.error };
+            }
+            if (onProgress && job.progress) {
+                onProgress(job.progress);
+            }
         }
     }
+
+    async postJSON(url, body) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        return response.json();
+    }
 }
\ No newline at end of file
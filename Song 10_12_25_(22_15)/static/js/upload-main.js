@@ -118,6 +118,12 @@ const uploadManager = {
                             <div class="album-item-name">${albumName}</div>
                             <div class="album-item-info">Saved in Google Drive</div>
                         </div>
+                        <button class="btn btn-secondary copy-album-btn" data-album="${albumName}" data-mode="clone" style="padding: 8px 16px; margin-right: 8px;">
+                            📋 Copy
+                        </button>
+                        <button class="btn btn-secondary copy-album-btn" data-album="${albumName}" data-mode="rename" style="padding: 8px 16px; margin-right: 8px;">
+                            ✏️ Rename
+                        </button>
                         <button class="btn btn-secondary delete-album-btn" data-album="${albumName}" style="background: rgba(255,0,0,0.2); border-color: rgba(255,0,0,0.4); color: #ff4444; padding: 8px 16px;">
                             🗑️ Delete
                         </button>
@@ -130,6 +136,14 @@ const uploadManager = {
                     item.addEventListener('click', () => this.loadAlbum(albumName));
                 });
                 
+                // Add click listeners for copy/rename buttons
+                document.querySelectorAll('.copy-album-btn').forEach(btn => {
+                    btn.addEventListener('click', (e) => {
+                        e.stopPropagation();
+                        this.copyAlbum(btn.dataset.album, btn.dataset.mode === 'rename');
+                    });
+                });
+                
                 // Add click listeners for delete buttons
                 document.querySelectorAll('.delete-album-btn').forEach(btn => {
                     btn.addEventListener('click', (e) => {
@@ -224,7 +238,7 @@ const uploadManager = {
                 body: JSON.stringify({ album: albumName })
             });
             
-            const result = await response.json();
+            const result = await this.api.waitForJob(await response.json());
             
             this.ui.hideProgressModal();
             
@@ -242,6 +256,41 @@ const uploadManager = {
         }
     },
     
+    // Copy or rename an album - files are copied inside R2, nothing is re-uploaded
+    async copyAlbum(albumName, rename) {
+        const newName = prompt(rename ? `Rename "${albumName}" to:` : `Name for the copy of "${albumName}":`, albumName);
+        if (!newName || newName.trim() === albumName) return;
+        
+        const action = rename ? 'Renaming' : 'Copying';
+        try {
+            this.ui.showProgressModal(`${action} Album`);
+            this.ui.updateProgress(0, 1, `${action} "${albumName}"...`);
+            
+            const response = await fetch(rename ? '/api/album/rename' : '/api/album/clone', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ album: albumName, newName: newName.trim() })
+            });
+            
+            const result = await this.api.waitForJob(await response.json(), progress => {
+                this.ui.updateProgress(progress.done, progress.total, progress.message);
+            });
+            
+            this.ui.hideProgressModal();
+            
+            if (result.status === 'success') {
+                alert(`✅ ${result.message}`);
+                this.openSelectAlbumModal();
+            } else {
+                alert(`❌ Failed: ${result.message}`);
+            }
+        } catch (error) {
+            console.error(`Error ${action.toLowerCase()} album:`, error);
+            this.ui.hideProgressModal();
+            alert(`❌ Error ${action.toLowerCase()} album: ${error.message}`);
+        }
+    },
+    
     changeTrackCount(delta) {
         const newCount = this.totalTracksCount + delta;
         if (newCount >= 1 && newCount <= 16) {
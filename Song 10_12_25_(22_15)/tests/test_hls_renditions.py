@@ -0,0 +1,43 @@
+"""
+HLS renditions against the in-process R2 stand-in used by the benchmarks
+
+Usage:
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fake_r2 import FakeR2
+from r2_manager import R2Manager
+
+
+class FakeTranscoder:
+    def transcode(self, input_path, output_dir):
+        with open(os.path.join(output_dir, 'master.m3u8'), 'w') as f:
+            f.write('#EXTM3U\n')
+        return ['master.m3u8']
+    
+    def content_type(self, relative_path):
+        return 'application/vnd.apple.mpegurl'
+
+
+def test_reupload_deletes_the_renditions_it_replaced(tmp_path, monkeypatch):
+    monkeypatch.setenv('R2_PUBLIC_URL', 'https://pub-test.r2.dev')
+    manager = R2Manager(s3_client=FakeR2())
+    manager.initialize_album_structure('album', 1, ['Style'], use_transitions=False)
+    
+    for upload in range(3):
+        audio_path = tmp_path / f'upload_{upload}.mp3'
+        audio_path.write_bytes(os.urandom(256))
+        manager.upload_track_file('album', 1, 'audio', 'style_1', str(audio_path))
+        playlist_url = manager.build_hls_renditions('album', 1, 'style_1', FakeTranscoder())
+    
+    rendition_keys = [key for key in manager.s3.objects if '/hls/' in key]
+    assert rendition_keys == [manager.key_from_url(playlist_url)]
+    
+    track_info = manager._download_json(manager._get_file_path('album', 1, 'track_info'))
+    assert track_info['styles']['style_1']['hls_url'] == playlist_url
+    assert 'stale_hls_url' not in track_info['styles']['style_1']
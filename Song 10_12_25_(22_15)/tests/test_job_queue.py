@@ -0,0 +1,76 @@
+"""
+Background job leases and retries
+
+Usage:
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue
+
+
+def run_until_finished(queue, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['state'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job still {job['state']} after {timeout}s")
+
+
+def test_heartbeat_keeps_a_long_job_leased(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / 'jobs.db'), workers=2, lease_seconds=0.3, poll_interval=0.05)
+    runs = []
+    lock = threading.Lock()
+    
+    def slow(payload, progress):
+        with lock:
+            runs.append(payload)
+        # Several leases long, without ever reporting progress
+        time.sleep(1.5)
+        return 'done'
+    
+    queue.register('slow', slow)
+    queue.start()
+    try:
+        job = run_until_finished(queue, queue.enqueue('slow', {}))
+    finally:
+        queue.shutdown()
+    
+    assert job['state'] == 'succeeded'
+    assert job['attempts'] == 1
+    assert len(runs) == 1
+
+
+def test_only_retryable_errors_are_retried(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / 'jobs.db'), max_attempts=3, poll_interval=0.05)
+    calls = {'permanent': 0, 'flaky': 0}
+    
+    def permanent(payload, progress):
+        calls['permanent'] += 1
+        raise Exception("Album not found")
+    
+    def flaky(payload, progress):
+        calls['flaky'] += 1
+        if calls['flaky'] == 1:
+            raise ConnectionError("Connection reset")
+        return 'ok'
+    
+    queue.register('permanent', permanent)
+    queue.register('flaky', flaky)
+    queue.start()
+    try:
+        failed = run_until_finished(queue, queue.enqueue('permanent', {}))
+        retried = run_until_finished(queue, queue.enqueue('flaky', {}))
+    finally:
+        queue.shutdown()
+    
+    assert failed['state'] == 'failed' and failed['attempts'] == 1
+    assert failed['error'] == 'Album not found'
+    assert retried['state'] == 'succeeded' and retried['attempts'] == 2
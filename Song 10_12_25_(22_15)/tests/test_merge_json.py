@@ -0,0 +1,91 @@
+"""
+Three-way merges of metadata documents whose write-back to R2 conflicted
+
+Usage:
+    python -m pytest tests
+"""
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metadata_store import MetadataStore, merge_json
+from r2_manager import R2Manager
+
+
+def merge_document(file_path, base, local, remote):
+    # _merge_document only needs the documents, not a connected manager
+    manager = object.__new__(R2Manager)
+    return json.loads(manager._merge_document(
+        file_path, json.dumps(base) if base is not None else None, json.dumps(local), json.dumps(remote)
+    ))
+
+
+def test_identical_documents_created_on_both_sides_are_kept_as_is():
+    head = {'next_id': 2, 'count': 1, 'segment_size': 50}
+    assert merge_json(None, head, dict(head)) == head
+    assert merge_json(None, {'track_number': 3}, {'track_number': 3}) == {'track_number': 3}
+
+
+def test_numbers_without_a_base_keep_theirs():
+    assert merge_json(None, {'track_number': 3}, {'track_number': 4}) == {'track_number': 4}
+    assert merge_json({}, {'plays': 2}, {'plays': 5}) == {'plays': 5}
+
+
+def test_numbers_changed_on_both_sides_keep_theirs():
+    # Derived counts: adding up both sides' changes would count the same like twice
+    base = {'social': {'likes': 1, 'comments': 4}}
+    local = {'social': {'likes': 2, 'comments': 4}}
+    remote = {'social': {'likes': 2, 'comments': 5}}
+    assert merge_json(base, local, remote) == {'social': {'likes': 2, 'comments': 5}}
+
+
+def test_one_sided_changes_win():
+    base = {'title': 'a', 'plays': 1}
+    assert merge_json(base, {'title': 'b', 'plays': 1}, base) == {'title': 'b', 'plays': 1}
+    assert merge_json(base, base, {'title': 'c', 'plays': 1}) == {'title': 'c', 'plays': 1}
+
+
+def test_other_values_changed_on_both_sides_keep_ours():
+    assert merge_json({'title': 'a'}, {'title': 'ours'}, {'title': 'theirs'}) == {'title': 'ours'}
+
+
+def test_lists_keep_both_sides_additions_and_removals():
+    merged = merge_json(['a', 'b', 'c'], ['a', 'c', 'd'], ['a', 'b', 'e'])
+    assert sorted(merged) == ['a', 'd', 'e']
+
+
+def test_numbered_items_added_on_both_sides_stay_in_id_order():
+    base = [{'id': 1, 'text': 'first'}]
+    local = base + [{'id': 3, 'text': 'ours'}]
+    remote = base + [{'id': 2, 'text': 'theirs'}]
+    assert merge_json(base, local, remote) == [
+        {'id': 1, 'text': 'first'}, {'id': 2, 'text': 'theirs'}, {'id': 3, 'text': 'ours'}
+    ]
+
+
+def test_like_count_follows_the_merged_likes():
+    base = {'likes': ['a'], 'like_count': 1}
+    merged = merge_document(
+        'albums/x/tracks/1/social_data.json', base, {'likes': ['a', 'b'], 'like_count': 2},
+        {'likes': ['c'], 'like_count': 1}
+    )
+    assert sorted(merged['likes']) == ['b', 'c']
+    assert merged['like_count'] == 2
+
+
+def test_like_count_is_not_counted_twice():
+    base = {'likes': ['a'], 'like_count': 1}
+    merged = merge_document(
+        'albums/x/tracks/1/social_data.json', base, {'likes': ['a', 'b'], 'like_count': 2},
+        {'likes': ['a', 'b', 'c'], 'like_count': 3}
+    )
+    assert sorted(merged['likes']) == ['a', 'b', 'c']
+    assert merged['like_count'] == 3
+
+
+def test_comment_heads_stay_in_r2():
+    # Comment IDs are handed out by R2's conditional write, so segments never merge colliding IDs
+    assert not MetadataStore.handles('albums/x/tracks/1/comments/head.json')
+    assert MetadataStore.handles('albums/x/tracks/1/comments/segment_00000.json')
@@ -0,0 +1,63 @@
+import os
+import shutil
+import subprocess
+
+
+class HLSTranscoder:
+    """
+    Turns an uploaded MP3 into segmented HLS audio at several bitrates
+    Uses the ffmpeg binary if it is installed; without it available() is
+    False and uploads simply keep their single MP3.
+    Output layout: master.m3u8 plus <bitrate>k/index.m3u8 and segments.
+    """
+    
+    CONTENT_TYPES = {
+        '.m3u8': 'application/vnd.apple.mpegurl',
+        '.ts': 'video/mp2t'
+    }
+    
+    def __init__(self, ffmpeg_path='ffmpeg', bitrates=(64, 128, 192), segment_seconds=6, timeout=600):
+        self.ffmpeg_path = shutil.which(ffmpeg_path)
+        self.bitrates = tuple(bitrates)
+        self.segment_seconds = segment_seconds
+        self.timeout = timeout
+    
+    def available(self):
+        return self.ffmpeg_path is not None
+    
+    def transcode(self, input_path, output_dir):
+        """Write the renditions into output_dir, returns their paths relative to it in upload order"""
+        if not self.available():
+            raise Exception("ffmpeg not found - HLS transcoding is disabled")
+        
+        command = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y', '-i', input_path]
+        for _ in self.bitrates:
+            command += ['-map', '0:a:0']
+        command += ['-c:a', 'aac', '-ac', '2']
+        for index, bitrate in enumerate(self.bitrates):
+            command += [f'-b:a:{index}', f'{bitrate}k']
+        command += [
+            '-var_stream_map', ' '.join(f'a:{index},name:{bitrate}k' for index, bitrate in enumerate(self.bitrates)),
+            '-f', 'hls',
+            '-hls_time', str(self.segment_seconds),
+            '-hls_playlist_type', 'vod',
+            '-hls_segment_filename', os.path.join(output_dir, '%v', 'segment_%04d.ts'),
+            '-master_pl_name', 'master.m3u8',
+            os.path.join(output_dir, '%v', 'index.m3u8')
+        ]
+        
+        result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+        
+        files = []
+        for root, _, names in os.walk(output_dir):
+            for name in names:
+                files.append(os.path.relpath(os.path.join(root, name), output_dir))
+        
+        # Segments first, then variant playlists, then the master playlist
+        files.sort(key=lambda path: (path == 'master.m3u8', path.endswith('.m3u8'), path))
+        return files
+    
+    def content_type(self, path):
+        return self.CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream')